@@ -0,0 +1,132 @@
+import logging
+import threading
+import time
+
+from django.contrib.auth import SESSION_KEY
+from django.db import DatabaseError, connections
+from django.utils.timezone import now
+
+from . import settings
+from .functions import get_guest_model
+from .sessions import LAST_SEEN_SESSION_KEY, is_guest_session
+
+logger = logging.getLogger(__name__)
+
+
+class LastSeenBuffer:
+    """
+    Collect last seen updates of guests and write them with a single query.
+
+    Updates are written when :attr:`GUEST_USER_LAST_SEEN_BATCH_SIZE<guest_user.app_settings.AppSettings.LAST_SEEN_BATCH_SIZE>`
+    guests are pending or the oldest pending update is older than
+    :attr:`GUEST_USER_LAST_SEEN_INTERVAL<guest_user.app_settings.AppSettings.LAST_SEEN_INTERVAL>`.
+    The interval is checked when a request finishes. A timer writes the
+    updates of processes that receive no further requests.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._since = None
+        self._timer = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, user_pk):
+        with self._lock:
+            if not self._pending:
+                self._since = time.monotonic()
+                if settings.LAST_SEEN_BATCH_SIZE > 1:
+                    # Single updates are written right away.
+                    self._start_timer()
+            self._pending.add(user_pk)
+            due = len(self._pending) >= settings.LAST_SEEN_BATCH_SIZE
+        if due or self.is_due():
+            self.flush()
+
+    def is_due(self) -> bool:
+        """
+        Check if the oldest pending update is older than the interval.
+
+        """
+        since = self._since
+        return (
+            bool(self._pending)
+            and since is not None
+            and time.monotonic() - since >= settings.LAST_SEEN_INTERVAL
+        )
+
+    def flush(self) -> int:
+        """
+        Write all pending updates.
+
+        :returns: The number of updated guests.
+
+        """
+        with self._lock:
+            user_pks, self._pending = self._pending, set()
+            self._since = None
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not user_pks:
+            return 0
+        return (
+            get_guest_model().objects.filter(user__in=user_pks).update(last_seen=now())
+        )
+
+    def _start_timer(self):
+        self._timer = threading.Timer(settings.LAST_SEEN_INTERVAL, self._flush_later)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _flush_later(self):
+        try:
+            self.flush()
+        finally:
+            # The timer thread has its own connections.
+            connections.close_all()
+
+
+last_seen_buffer = LastSeenBuffer()
+
+
+def flush_last_seen(sender, **kwargs):
+    """
+    Write the pending last seen updates once they are due.
+
+    Connected to the ``request_finished`` signal when sliding expiry is enabled.
+    Database errors are logged, so the receivers after it still close the
+    connections of the request.
+
+    """
+    if last_seen_buffer.is_due():
+        try:
+            last_seen_buffer.flush()
+        except DatabaseError:
+            logger.exception("Writing last seen updates failed.")
+
+
+def touch_guest(request) -> bool:
+    """
+    Record that the guest of the current session was seen.
+
+    The time of the last update is stored in the session and the database is
+    only updated once per :attr:`GUEST_USER_LAST_SEEN_INTERVAL<guest_user.app_settings.AppSettings.LAST_SEEN_INTERVAL>`.
+
+    :returns: True if an update was recorded.
+
+    """
+    session = request.session
+    timestamp = int(time.time())
+    last_seen = session.get(LAST_SEEN_SESSION_KEY)
+    if last_seen is not None and timestamp - last_seen < settings.LAST_SEEN_INTERVAL:
+        return False
+    if not is_guest_session(request):
+        return False
+
+    session[LAST_SEEN_SESSION_KEY] = timestamp
+    last_seen_buffer.add(session[SESSION_KEY])
+    return True
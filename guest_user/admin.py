@@ -1,32 +1,224 @@
+import json
 from datetime import timedelta
 
 from django.contrib import admin
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
+from django.contrib.auth import get_permission_codename, get_user_model
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import BooleanField, Case, Q, QuerySet, Value, When
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from django.utils.text import capfirst
 
-from . import settings
+from . import cleanup, deletion, settings
 from .functions import get_guest_model
-from .models import Guest
+from .models import Guest, expired_q
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that uses the estimates of PostgreSQL to count large querysets.
+
+    Unfiltered querysets are estimated from the table statistics, filtered
+    querysets from the row estimate of their query plan. Querysets with more than
+    ``estimate_threshold`` estimated rows are not counted. Other querysets and
+    databases use an exact count.
+
+    """
+
+    estimate_threshold = 100000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == "postgresql":
+            estimate = self.estimate_count(connection, queryset)
+            if estimate is not None and estimate > self.estimate_threshold:
+                return estimate
+        return super().count
+
+    @staticmethod
+    def estimate_count(connection, queryset):
+        with connection.cursor() as cursor:
+            if not queryset.query.has_filters():
+                cursor.execute(
+                    "SELECT reltuples FROM pg_class WHERE oid = to_regclass(%s)",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+                return int(row[0]) if row else None
+
+            sql, params = queryset.order_by().query.sql_with_params()
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+
+CURSOR_VAR = "cursor"
+
+
+class KeysetChangeList(ChangeList):
+    """
+    Change list that pages through guests by ``(created_at, pk)`` instead of offsets.
+
+    With the default ordering, pages are selected with a cursor on the first or
+    last row of the current page, so every page costs the same. The page numbers
+    are replaced by links to the first, previous and next page, and the number
+    of results is estimated by the paginator. Other orderings use the regular
+    pagination.
+
+    """
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    @property
+    def keyset(self) -> bool:
+        return ORDER_VAR not in self.params and not self.show_all
+
+    def get_results(self, request):
+        self.first_url = self.previous_url = self.next_url = None
+        if not self.keyset:
+            return super().get_results(request)
+
+        # The page is selected by the cursor, so the paginator only counts the
+        # results, which is estimated for large querysets.
+        self.paginator = self.model_admin.get_paginator(
+            request, self.queryset, self.list_per_page
+        )
+        self.result_count = self.paginator.count
+        self.show_full_result_count = self.model_admin.show_full_result_count
+        self.full_result_count = (
+            self.model_admin.get_paginator(
+                request, self.root_queryset, self.list_per_page
+            ).count
+            if self.show_full_result_count
+            else None
+        )
+        self.show_admin_actions = not self.show_full_result_count or bool(
+            self.full_result_count
+        )
+
+        queryset = self.queryset.order_by("-created_at", "-pk")
+        before, created_at, pk = self.parse_cursor(self.params.get(CURSOR_VAR))
+        if created_at is None:
+            page = list(queryset[: self.list_per_page + 1])
+            has_previous, has_next = False, len(page) > self.list_per_page
+            page = page[: self.list_per_page]
+        elif before:
+            page = list(
+                queryset.filter(
+                    Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk)
+                ).reverse()[: self.list_per_page + 1]
+            )
+            has_previous, has_next = len(page) > self.list_per_page, True
+            page = page[: self.list_per_page][::-1]
+        else:
+            page = list(
+                queryset.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+                )[: self.list_per_page + 1]
+            )
+            has_previous, has_next = True, len(page) > self.list_per_page
+            page = page[: self.list_per_page]
+
+        self.result_list = page
+        self.can_show_all = False
+        self.multi_page = has_previous or has_next
+        if has_previous:
+            self.first_url = self.get_query_string(remove=[CURSOR_VAR])
+            self.previous_url = self.get_query_string(
+                {CURSOR_VAR: self.format_cursor(True, page[0])}
+            )
+        if has_next:
+            self.next_url = self.get_query_string(
+                {CURSOR_VAR: self.format_cursor(False, page[-1])}
+            )
+
+    @staticmethod
+    def format_cursor(before: bool, obj) -> str:
+        return f"{'b' if before else 'a'}:{obj.created_at.isoformat()}:{obj.pk}"
+
+    @staticmethod
+    def parse_cursor(cursor):
+        """
+        Return the direction, ``created_at`` and pk of a cursor.
+
+        Invalid cursors start at the first page.
+
+        """
+        try:
+            direction, value = cursor.split(":", 1)
+            created_at, pk = value.rsplit(":", 1)
+            created_at = parse_datetime(created_at)
+            if direction not in ("a", "b") or created_at is None:
+                raise ValueError
+            return direction == "b", created_at, int(pk)
+        except (AttributeError, ValueError):
+            return False, None, None
+
+
+class ExpiredListFilter(admin.SimpleListFilter):
+    title = "expired"
+    parameter_name = "expired"
+
+    def lookups(self, request, model_admin):
+        return [("yes", "Yes"), ("no", "No")]
+
+    def queryset(self, request, queryset):
+        if self.value() == "yes":
+            return queryset.filter(expired_q())
+        if self.value() == "no":
+            return queryset.exclude(expired_q())
+        return queryset
 
 
 class GuestAdmin(admin.ModelAdmin):
     list_display = ["user", "created_at", "is_expired"]
+    list_select_related = ["user"]
+    list_filter = [ExpiredListFilter]
+    date_hierarchy = "created_at"
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     actions = ["delete_expired_guests"]
     fields = ["user", "created_at"]
     readonly_fields = ["user", "created_at", "is_expired"]
 
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(
+                expired=Case(
+                    When(expired_q(), then=Value(True)),
+                    default=Value(False),
+                    output_field=BooleanField(),
+                )
+            )
+        )
+
     def is_expired(self, obj):
-        return obj.is_expired()
+        expired = getattr(obj, "expired", None)
+        return obj.is_expired() if expired is None else expired
 
     is_expired.boolean = True
+    is_expired.admin_order_field = "expired"
 
     def delete_expired_guests(self, request, queryset):
-        expired_guests = queryset.filter_expired()
-        count = expired_guests.count()
-
-        for guest in expired_guests:
-            # Call delete method to trigger signals and cascades
-            guest.user.delete()
-
-        self.message_user(request, f"Deleted {count} guests.")
+        stats = cleanup.delete_expired_guests(queryset=queryset)
+        self.message_user(
+            request,
+            f"Deleted {stats.guests} guests ({stats.objects} objects in total).",
+        )
 
     delete_expired_guests.short_description = (
         "Delete selected guests older than {}".format(
@@ -47,24 +239,63 @@ class GuestAdmin(admin.ModelAdmin):
         This Guest admin's DELETE actions will always try to delete the associated
         user objects instead of the guest instances, to allow a full cascade.
 
+        Above :attr:`GUEST_USER_ADMIN_DELETE_SUMMARY_THRESHOLD<guest_user.app_settings.AppSettings.ADMIN_DELETE_SUMMARY_THRESHOLD>`
+        selected guests only the number of deleted objects per model is shown.
+
+        """
+        UserModel = get_user_model()
+        if isinstance(objs, QuerySet):
+            users = UserModel._base_manager.filter(pk__in=objs.values("user"))
+            selected = objs.count()
+        else:
+            users = UserModel._base_manager.filter(pk__in=[obj.user_id for obj in objs])
+            selected = len(objs)
+
+        if selected <= settings.ADMIN_DELETE_SUMMARY_THRESHOLD:
+            return super().get_deleted_objects(list(users), request)
+        return self.get_deleted_objects_summary(users, request)
+
+    def get_deleted_objects_summary(self, users, request):
+        """
+        Return the same values as :meth:`get_deleted_objects` with counts only.
+
         """
-        user_objs = [obj.user for obj in objs]
-        return super().get_deleted_objects(user_objs, request)
+        counts, protected = deletion.count_deleted_objects(users)
+
+        model_count = {}
+        perms_needed = set()
+        for model, count in counts.items():
+            opts = model._meta
+            model_count[opts.verbose_name_plural] = count
+            if model in self.admin_site._registry and not request.user.has_perm(
+                f"{opts.app_label}.{get_permission_codename('delete', opts)}"
+            ):
+                perms_needed.add(opts.verbose_name)
+
+        deleted_objects = [
+            f"{capfirst(name)}: {count}" for name, count in model_count.items()
+        ]
+        protected_objects = [
+            f"{capfirst(model._meta.verbose_name_plural)}: {count}"
+            for model, count in protected.items()
+        ]
+        return deleted_objects, model_count, perms_needed, protected_objects
 
     def delete_model(self, request, obj):
         """
         Make the delete action cascade.
 
         """
-        obj.user.delete()
+        get_guest_model().objects.delete_users([obj.user_id])
 
     def delete_queryset(self, request, queryset):
         """
         Make the delete action cascade.
 
+        Users are deleted in batches with set-based queries.
+
         """
-        for obj in queryset:
-            obj.user.delete()
+        cleanup.delete_guests(queryset)
 
 
 if get_guest_model() == Guest:
@@ -1,5 +1,6 @@
 import re
 from re import Pattern
+from typing import List
 
 
 class AppSettings:
@@ -221,3 +222,294 @@ class AppSettings:
 
         """
         return self.get("MODEL", "guest_user.Guest")
+
+    @property
+    def CACHE(self) -> str:
+        """
+        Name of a cache from the :ref:`django:ref/settings:``caches``` setting
+        used to store the guest status of users.
+
+        The status is shared between all processes using the same cache and
+        is invalidated when guests are created, converted or deleted.
+        Changes to the Guest table that bypass the ORM (e.g. raw SQL) are not
+        detected until the cached entries expire.
+
+        :default: ``None`` (disabled)
+
+        """
+        return self.get("CACHE", None)
+
+    @property
+    def CACHE_TIMEOUT(self) -> int:
+        """
+        Timeout in seconds for the cached guest status.
+
+        :default: ``None`` (the default timeout of the cache)
+
+        """
+        return self.get("CACHE_TIMEOUT", None)
+
+    @property
+    def BLOOM_FILTER(self) -> bool:
+        """
+        Keep a Bloom filter of all guest user IDs in each process.
+
+        Users that are not in the filter are known to be registered users
+        without querying the database. This is useful if registered users
+        greatly outnumber guests.
+
+        The filter is refreshed every
+        :attr:`GUEST_USER_BLOOM_FILTER_REFRESH_INTERVAL<guest_user.app_settings.AppSettings.BLOOM_FILTER_REFRESH_INTERVAL>`
+        seconds. Only users that existed before the previous refresh can be
+        answered from the filter, all other users are checked in the database.
+
+        The filter requires integer primary keys on the user model.
+
+        :default: ``False``
+
+        """
+        return self.get("BLOOM_FILTER", False)
+
+    @property
+    def BLOOM_FILTER_CAPACITY(self) -> int:
+        """
+        Minimum number of guest IDs the Bloom filter is sized for.
+
+        The filter is sized for twice the current number of guests when rebuilt,
+        but no smaller than this value.
+
+        :default: ``100000``
+
+        """
+        return self.get("BLOOM_FILTER_CAPACITY", 100000)
+
+    @property
+    def BLOOM_FILTER_ERROR_RATE(self) -> float:
+        """
+        False positive rate of the Bloom filter at full capacity.
+
+        :default: ``0.01``
+
+        """
+        return self.get("BLOOM_FILTER_ERROR_RATE", 0.01)
+
+    @property
+    def BLOOM_FILTER_REFRESH_INTERVAL(self) -> int:
+        """
+        Seconds between adding newly created guests to the Bloom filter.
+
+        :default: ``60``
+
+        """
+        return self.get("BLOOM_FILTER_REFRESH_INTERVAL", 60)
+
+    @property
+    def BLOOM_FILTER_REBUILD_INTERVAL(self) -> int:
+        """
+        Seconds between rebuilding the Bloom filter to remove deleted
+        and converted guests.
+
+        :default: ``3600``
+
+        """
+        return self.get("BLOOM_FILTER_REBUILD_INTERVAL", 3600)
+
+    @property
+    def FLAG_FIELD(self) -> str:
+        """
+        Name of a boolean field on the user model that marks guest users.
+
+        If set, the guest status is read from and written to this field
+        instead of checking for a Guest instance. Use
+        :class:`GuestUserMixin<guest_user.base_user.GuestUserMixin>` to add
+        an ``is_guest`` field to your custom user model.
+
+        Run the ``backfill_guest_flag`` management command after enabling this
+        setting to set the field for existing guests.
+
+        :default: ``None``
+
+        """
+        return self.get("FLAG_FIELD", None)
+
+    @property
+    def SESSION_SNAPSHOT(self) -> bool:
+        """
+        Keep a signed snapshot of guest users in their session.
+
+        Requires ``guest_user.middleware.GuestAuthenticationMiddleware`` in place
+        of Django's ``AuthenticationMiddleware``. Guest users are then restored
+        from the snapshot without querying the database.
+
+        The snapshot is updated when the guest is saved during a request and
+        removed when they convert. Changes to guest users made outside of their
+        own requests are not visible to them while the snapshot is valid.
+
+        The snapshot is only valid until the guest expires. Guests deleted before
+        that, e.g. in the admin, keep their snapshot unless
+        :attr:`GUEST_USER_PURGE_SESSIONS<guest_user.app_settings.AppSettings.PURGE_SESSIONS>`
+        deletes their sessions.
+
+        :default: ``False``
+
+        """
+        return self.get("SESSION_SNAPSHOT", False)
+
+    @property
+    def CHECK_PERMISSIONS(self) -> bool:
+        """
+        Look up permissions of guest users in the database.
+
+        By default guest users loaded by the ``GuestBackend`` are assumed to have no
+        permissions and permission checks for them do not query the database.
+        Enable this setting if you grant permissions or groups to guest users.
+
+        :default: ``False``
+
+        """
+        return self.get("CHECK_PERMISSIONS", False)
+
+    @property
+    def DELETE_BATCH_SIZE(self) -> int:
+        """
+        Number of guest users deleted per query when cleaning up expired guests.
+
+        :default: ``500``
+
+        """
+        return self.get("DELETE_BATCH_SIZE", 500)
+
+    @property
+    def PURGE_SESSIONS(self) -> bool:
+        """
+        Delete the sessions of guest users together with the guests.
+
+        The session key of a guest is recorded when they log in and their session
+        is removed from the configured session engine when the guest is deleted.
+        This keeps the session table from filling up with sessions of deleted
+        guests between runs of ``clearsessions``.
+
+        Sessions of guests created before enabling this setting are not recorded.
+
+        :default: ``False``
+
+        """
+        return self.get("PURGE_SESSIONS", False)
+
+    @property
+    def SLIDING_EXPIRY(self) -> bool:
+        """
+        Expire guest users after a period of inactivity instead of after creation.
+
+        Requires ``guest_user.middleware.GuestActivityMiddleware``, which records
+        when guests were last seen. Guests are then deleted when they have not
+        been seen for :attr:`GUEST_USER_MAX_AGE<guest_user.app_settings.AppSettings.MAX_AGE>`
+        seconds. Guests that were never seen expire based on their creation time.
+
+        :default: ``False``
+
+        """
+        return self.get("SLIDING_EXPIRY", False)
+
+    @property
+    def LAST_SEEN_INTERVAL(self) -> int:
+        """
+        Minimum number of seconds between two updates of the last seen time of a guest.
+
+        The time of the last update is kept in the session of the guest, so
+        requests in between do not write to the database.
+
+        :default: ``300``
+
+        """
+        return self.get("LAST_SEEN_INTERVAL", 300)
+
+    @property
+    def LAST_SEEN_BATCH_SIZE(self) -> int:
+        """
+        Number of last seen updates collected per process before they are written
+        with a single query.
+
+        Pending updates are also written when the oldest one is older than
+        :attr:`GUEST_USER_LAST_SEEN_INTERVAL<guest_user.app_settings.AppSettings.LAST_SEEN_INTERVAL>`
+        and when the process exits.
+
+        :default: ``1`` (write every update immediately)
+
+        """
+        return self.get("LAST_SEEN_BATCH_SIZE", 1)
+
+    @property
+    def ADMIN_DELETE_SUMMARY_THRESHOLD(self) -> int:
+        """
+        Number of selected guests above which the admin delete confirmation
+        only shows the number of deleted objects per model.
+
+        The full list of deleted objects is built in memory and can get very
+        large for many guests with related objects.
+
+        :default: ``100``
+
+        """
+        return self.get("ADMIN_DELETE_SUMMARY_THRESHOLD", 100)
+
+    @property
+    def ARCHIVE_MODELS(self) -> List[str]:
+        """
+        Labels of models to archive together with expired guests, like ``"shop.Cart"``.
+
+        Rows of these models that reference a guest user through a foreign key are
+        written to the archive when cleaning up with the ``--archive`` option.
+        Users and Guest instances are always archived.
+
+        :default: ``[]``
+
+        """
+        return self.get("ARCHIVE_MODELS", [])
+
+    @property
+    def DELETION_PLANNER(self) -> bool:
+        """
+        Delete guest users and their related objects with the
+        :class:`~guest_user.deletion.DeletionPlanner`.
+
+        The planner deletes related objects with one bulk query per relation and
+        falls back to Django's deletion collector for relations it doesn't support.
+        It sends ``pre_delete`` and ``post_delete`` signals like the collector, but
+        follows relations itself and relies on Django's private
+        ``QuerySet._raw_delete()``. By default the collector is used.
+
+        :default: ``False``
+
+        """
+        return self.get("DELETION_PLANNER", False)
+
+    @property
+    def DB_CASCADE(self) -> bool:
+        """
+        Leave cascading deletes of guest users to the database where possible.
+
+        Relations with a matching ``ON DELETE CASCADE`` or ``ON DELETE SET NULL``
+        constraint in the database are not handled in Python when deleting guests.
+        Use the ``guest_user_db_cascade`` command to create these constraints for
+        the models in :attr:`GUEST_USER_DB_CASCADE_MODELS<guest_user.app_settings.AppSettings.DB_CASCADE_MODELS>`.
+        Signals are not sent for objects deleted by the database.
+        Requires :attr:`GUEST_USER_DELETION_PLANNER<guest_user.app_settings.AppSettings.DELETION_PLANNER>`.
+
+        :default: ``False``
+
+        """
+        return self.get("DB_CASCADE", False)
+
+    @property
+    def DB_CASCADE_MODELS(self) -> List[str]:
+        """
+        Labels of models whose foreign keys to guest users get database
+        constraints with ``ON DELETE CASCADE``, like ``"shop.Cart"``.
+
+        The Guest model is always included.
+
+        :default: ``[]``
+
+        """
+        return self.get("DB_CASCADE_MODELS", [])
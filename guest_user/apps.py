@@ -7,4 +7,45 @@ class GuestUserConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
 
     def ready(self):
+        from django.contrib.auth.signals import user_logged_in
+
         from . import checks  # noqa
+        from . import settings
+        from .receivers import guest_logged_in
+
+        user_logged_in.connect(guest_logged_in)
+
+        from django.db.models.signals import post_migrate
+
+        from .deletion import clear_user_deletion_planners
+
+        post_migrate.connect(clear_user_deletion_planners, sender=self)
+
+        if settings.SESSION_SNAPSHOT:
+            from django.conf import settings as django_settings
+            from django.db.models.signals import post_save
+
+            from .middleware import mark_snapshot_stale
+
+            post_save.connect(
+                mark_snapshot_stale, sender=django_settings.AUTH_USER_MODEL
+            )
+
+        if settings.SLIDING_EXPIRY:
+            from django.core.signals import request_finished
+            from django.db import close_old_connections
+
+            from .activity import flush_last_seen
+
+            # Write the updates before the connections of the request are closed.
+            request_finished.disconnect(close_old_connections)
+            request_finished.connect(flush_last_seen)
+            request_finished.connect(close_old_connections)
+
+        if settings.CACHE:
+            from django.db.models.signals import post_delete
+
+            from .cache import invalidate_guest_status
+            from .functions import get_guest_model
+
+            post_delete.connect(invalidate_guest_status, sender=get_guest_model())
@@ -0,0 +1,137 @@
+import gzip
+import io
+import json
+import os
+from typing import List
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core import serializers
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Q
+
+from . import settings
+from .functions import get_guest_model
+
+
+class GuestArchive:
+    """
+    Append expired guests and their related rows to a gzip compressed JSONL file.
+
+    Each batch is written as a separate gzip member, so the file can be extended
+    by later runs and loaded with ``loaddata``. Archived rows are serialized with
+    Django's ``jsonl`` serializer.
+
+    A checkpoint file next to the archive records the users of a batch between
+    archiving and deleting them. If a run is interrupted, the next run deletes
+    these users without archiving them again.
+
+    :param path: Path of the archive file, usually ending in ``.jsonl.gz``.
+    :param checkpoint: Path of the checkpoint file, defaults to the archive path
+      with a ``.checkpoint`` suffix.
+    :param model_labels: Labels of models with foreign keys to the user model to
+      archive in addition to users and guests. Defaults to
+      :attr:`GUEST_USER_ARCHIVE_MODELS<guest_user.app_settings.AppSettings.ARCHIVE_MODELS>`.
+    :raises ImproperlyConfigured: If a model has no foreign key to the user model.
+
+    """
+
+    def __init__(self, path: str, checkpoint: str = None, model_labels=None):
+        self.path = path
+        self.checkpoint = checkpoint or f"{path}.checkpoint"
+        if model_labels is None:
+            model_labels = settings.ARCHIVE_MODELS
+        UserModel = get_user_model()
+        self.models = []
+        for label in model_labels:
+            model = apps.get_model(label)
+            fields = [
+                field
+                for field in model._meta.concrete_fields
+                if field.is_relation and field.related_model is UserModel
+            ]
+            if not fields:
+                raise ImproperlyConfigured(
+                    f"{label} in GUEST_USER_ARCHIVE_MODELS has no foreign key "
+                    "to the user model."
+                )
+            self.models.append((model, fields))
+        self.rows = 0
+
+    def get_querysets(self, user_ids: List) -> list:
+        """
+        Return the querysets of all rows to archive for the given users.
+
+        """
+        querysets = [
+            get_user_model()._base_manager.filter(pk__in=user_ids),
+            get_guest_model()._base_manager.filter(user__in=user_ids),
+        ]
+        for model, fields in self.models:
+            condition = Q()
+            for field in fields:
+                condition |= Q(**{f"{field.name}__in": user_ids})
+            querysets.append(model._base_manager.filter(condition).order_by("pk"))
+        return querysets
+
+    def write_batch(self, user_ids: List) -> int:
+        """
+        Append the rows of the given users to the archive and record them
+        in the checkpoint.
+
+        :returns: The number of archived rows.
+
+        """
+        rows = 0
+
+        def count(objects):
+            nonlocal rows
+            for obj in objects:
+                rows += 1
+                yield obj
+
+        with open(self.path, "ab") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="ab") as compressed:
+                stream = io.TextIOWrapper(compressed, encoding="utf-8")
+                for queryset in self.get_querysets(user_ids):
+                    serializers.serialize(
+                        "jsonl", count(queryset.iterator()), stream=stream
+                    )
+                stream.flush()
+                stream.detach()
+            raw.flush()
+            os.fsync(raw.fileno())
+        self.save_checkpoint(user_ids)
+        self.rows += rows
+        return rows
+
+    def pending(self) -> List:
+        """
+        Return the users that were archived but not deleted by an interrupted run.
+
+        """
+        try:
+            with open(self.checkpoint) as f:
+                return json.load(f)["pending"]
+        except FileNotFoundError:
+            return []
+
+    def save_checkpoint(self, user_ids: List):
+        """
+        Record the users of the current batch. Call with an empty list once
+        they are deleted.
+
+        """
+        temp_path = f"{self.checkpoint}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"pending": list(user_ids)}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.checkpoint)
+
+    def commit(self):
+        """
+        Mark the current batch as deleted.
+
+        """
+        self.save_checkpoint([])
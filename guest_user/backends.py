@@ -1,7 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.backends import ModelBackend
 
-from .functions import is_guest_user
+from . import settings
+from .functions import GUEST_STATUS_ATTR, with_guest_status
 
 
 class GuestBackend(ModelBackend):
@@ -14,19 +15,65 @@ class GuestBackend(ModelBackend):
             return None
 
         UserModel = get_user_model()
+        # Only guests are loaded, registered users are rejected by the query.
+        guests = with_guest_status(UserModel.objects.all()).filter(
+            **{GUEST_STATUS_ATTR: True}
+        )
 
         try:
-            user = UserModel.objects.get(**{UserModel.USERNAME_FIELD: username})
+            user = guests.get(**{UserModel.USERNAME_FIELD: username})
         except UserModel.DoesNotExist:
             return None
-        if is_guest_user(user):
-            return user
-        return None
+        self.prime_permission_cache(user)
+        return user
 
     def get_user(self, user_id):
+        """Load the user along with their guest status in a single query."""
         UserModel = get_user_model()
         try:
-            user = UserModel._default_manager.get(pk=user_id)
+            user = with_guest_status(UserModel._default_manager.all()).get(pk=user_id)
         except UserModel.DoesNotExist:
             return None
+        self.prime_permission_cache(user)
         return user
+
+    def skip_permissions(self, user_obj) -> bool:
+        """
+        Check if the user is a known guest whose permissions need not be queried.
+
+        Only the guest status already loaded with the user is considered,
+        so users with an unknown status are never queried here.
+
+        """
+        return (
+            not settings.CHECK_PERMISSIONS
+            and getattr(user_obj, GUEST_STATUS_ATTR, None) is True
+        )
+
+    def prime_permission_cache(self, user_obj):
+        """
+        Fill the permission caches of a guest user with empty sets.
+
+        Other backends inheriting from ``ModelBackend`` will then also answer
+        permission checks for this user without queries.
+
+        """
+        if self.skip_permissions(user_obj):
+            user_obj._user_perm_cache = set()
+            user_obj._group_perm_cache = set()
+            user_obj._perm_cache = set()
+
+    def get_user_permissions(self, user_obj, obj=None):
+        if self.skip_permissions(user_obj):
+            return set()
+        return super().get_user_permissions(user_obj, obj=obj)
+
+    def get_group_permissions(self, user_obj, obj=None):
+        if self.skip_permissions(user_obj):
+            return set()
+        return super().get_group_permissions(user_obj, obj=obj)
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if self.skip_permissions(user_obj):
+            return set()
+        return super().get_all_permissions(user_obj, obj=obj)
@@ -0,0 +1,49 @@
+"""
+This module allows importing GuestUserMixin even when the guest_user app is not
+loaded yet, which is required when defining a custom user model.
+"""
+
+from django.db import models
+from django.db.models import Q
+
+
+class GuestUserMixin(models.Model):
+    """
+    Store the guest status on a custom user model.
+
+    Add this mixin to your custom user model and set
+    :attr:`GUEST_USER_FLAG_FIELD<guest_user.app_settings.AppSettings.FLAG_FIELD>`
+    to ``"is_guest"``. Checking whether a user is a guest then no longer requires
+    a query.
+
+    Example usage:
+
+    .. code:: python
+
+        from django.contrib.auth.models import AbstractUser
+        from guest_user.base_user import GuestUserMixin
+
+        class User(GuestUserMixin, AbstractUser):
+            pass
+
+    The partial index only contains guest users. It serves queries for flagged
+    users, like the ``backfill_guest_flag`` command. Expired guests are still
+    found through the Guest table.
+
+    """
+
+    is_guest = models.BooleanField(
+        verbose_name="Guest",
+        default=False,
+        help_text="Designates whether this user is a temporary guest.",
+    )
+
+    class Meta:
+        abstract = True
+        indexes = [
+            models.Index(
+                fields=["is_guest"],
+                condition=Q(is_guest=True),
+                name="%(app_label)s_%(class)s_guest",
+            ),
+        ]
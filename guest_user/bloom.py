@@ -0,0 +1,237 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.db.models import Max
+
+from . import settings
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """
+    A space efficient set of integers that may report false positives.
+
+    :param capacity: Expected number of items.
+    :param error_rate: Acceptable false positive rate at full capacity.
+
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(str(item).encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (first + i * second) % self.size
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+    @property
+    def memory_bytes(self) -> int:
+        """Size of the bit array in bytes."""
+        return len(self.bits)
+
+    @property
+    def false_positive_rate(self) -> float:
+        """Estimated false positive rate for the current number of items."""
+        return (1 - math.exp(-self.hash_count * self.count / self.size)) ** (
+            self.hash_count
+        )
+
+
+class GuestIdFilter:
+    """
+    Per-process Bloom filter of the primary keys of all guest users.
+
+    A negative answer means the user is not a guest and no query is needed.
+    A positive answer may be wrong and must be confirmed with the database.
+
+    The filter is refreshed incrementally from Guest instances created since the
+    last refresh, and rebuilt from scratch periodically to forget deleted
+    and converted guests.
+
+    Only users that existed before the previous refresh get a negative answer,
+    to allow for guests that were created concurrently in other processes.
+
+    Refreshes run in a background thread, one at a time per process, so
+    requests never wait for them. Requests keep using the previous filter
+    meanwhile, or query the database before the filter was first built.
+
+    """
+
+    # Re-read guests created shortly before the watermark to catch
+    # transactions that committed late.
+    overlap = timedelta(seconds=60)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+        self.bloom = None
+        self.watermark = None
+        self.trusted_user_pk = None
+        self.pending_user_pk = None
+        self.refreshed_at = 0.0
+        self.rebuilt_at = 0.0
+        self.retry_at = 0.0
+        self.thread = None
+
+    def _load(self, bloom, since=None):
+        """
+        Add the guests created after ``since`` to ``bloom``.
+
+        Returns the latest creation time seen and the highest user primary key
+        that existed before the guests were read.
+
+        """
+        from .functions import get_guest_model
+
+        GuestModel = get_guest_model()
+        UserModel = get_user_model()
+
+        max_user_pk = UserModel._default_manager.aggregate(max_pk=Max("pk"))["max_pk"]
+        guests = GuestModel.objects.order_by()
+        if since is not None:
+            guests = guests.filter(created_at__gte=since - self.overlap)
+
+        watermark = since
+        for user_pk, created_at in guests.values_list("user", "created_at").iterator():
+            bloom.add(user_pk)
+            if watermark is None or created_at > watermark:
+                watermark = created_at
+        return watermark, max_user_pk
+
+    def _update(self, watermark, max_user_pk):
+        # Users that existed at the previous refresh had their Guest
+        # instance committed by now.
+        self.trusted_user_pk = self.pending_user_pk
+        self.pending_user_pk = max_user_pk
+        self.watermark = watermark
+        self.refreshed_at = time.monotonic()
+
+    def rebuild(self):
+        """Build a new filter from all current guests."""
+        from .functions import get_guest_model
+
+        count = get_guest_model().objects.count()
+        bloom = BloomFilter(
+            max(count * 2, settings.BLOOM_FILTER_CAPACITY),
+            settings.BLOOM_FILTER_ERROR_RATE,
+        )
+        watermark, max_user_pk = self._load(bloom)
+        with self.lock:
+            self.bloom = bloom
+            self._update(watermark, max_user_pk)
+            self.rebuilt_at = self.refreshed_at
+
+    def refresh(self):
+        """Add guests created since the last refresh."""
+        if self.bloom is None:
+            return self.rebuild()
+        with self.lock:
+            watermark, max_user_pk = self._load(self.bloom, since=self.watermark)
+            self._update(watermark, max_user_pk)
+
+    def maybe_refresh(self):
+        """
+        Start refreshing or rebuilding the filter in a background thread if due.
+
+        Call it when a worker process starts to build the filter before the
+        first request.
+
+        """
+        current = time.monotonic()
+        if current < self.retry_at:
+            return
+        rebuild = self.bloom is None or (
+            current - self.rebuilt_at >= settings.BLOOM_FILTER_REBUILD_INTERVAL
+        )
+        if not rebuild and (
+            current - self.refreshed_at < settings.BLOOM_FILTER_REFRESH_INTERVAL
+        ):
+            return
+        if not self.refresh_lock.acquire(blocking=False):
+            # Another thread is already refreshing the filter.
+            return
+        self.thread = threading.Thread(
+            target=self._refresh_in_background,
+            args=(rebuild,),
+            name="guest-id-filter",
+            daemon=True,
+        )
+        self.thread.start()
+
+    def _refresh_in_background(self, rebuild):
+        try:
+            if rebuild:
+                self.rebuild()
+            else:
+                self.refresh()
+        except Exception:
+            logger.exception("Refreshing the guest ID filter failed.")
+            self.retry_at = time.monotonic() + settings.BLOOM_FILTER_REFRESH_INTERVAL
+        finally:
+            # The thread has its own connections.
+            connections.close_all()
+            self.refresh_lock.release()
+
+    def add(self, user_pk):
+        """Add a new guest created by this process."""
+        if self.bloom is not None:
+            with self.lock:
+                self.bloom.add(user_pk)
+
+    def is_not_guest(self, user_pk) -> bool:
+        """
+        Return ``True`` if the user is definitely not a guest.
+
+        """
+        self.maybe_refresh()
+        trusted_user_pk = self.trusted_user_pk
+        if trusted_user_pk is None or not isinstance(user_pk, int):
+            return False
+        if user_pk > trusted_user_pk:
+            return False
+        return user_pk not in self.bloom
+
+    def stats(self) -> dict:
+        """Return the memory footprint and estimated false positive rate."""
+        if self.bloom is None:
+            return {"items": 0, "memory_bytes": 0, "false_positive_rate": 0.0}
+        return {
+            "items": self.bloom.count,
+            "memory_bytes": self.bloom.memory_bytes,
+            "false_positive_rate": self.bloom.false_positive_rate,
+        }
+
+
+guest_id_filter = GuestIdFilter()
+"""
+The Bloom filter instance of the current process.
+
+Used by :func:`is_guest_user<guest_user.functions.is_guest_user>` when
+:attr:`GUEST_USER_BLOOM_FILTER<guest_user.app_settings.AppSettings.BLOOM_FILTER>`
+is enabled.
+
+"""
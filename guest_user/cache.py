@@ -0,0 +1,127 @@
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+from . import settings
+
+
+class GuestStatusCache:
+    """
+    Store the guest status of users in a Django cache backend.
+
+    Entries are keyed by the user's primary key and a generation counter.
+    Incrementing the generation invalidates all entries at once,
+    which is used after bulk operations like deleting expired guests.
+
+    """
+
+    key_prefix = "guest_user"
+
+    def __init__(self, alias: str, timeout=None):
+        self.alias = alias
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @property
+    def generation_key(self) -> str:
+        return f"{self.key_prefix}:generation"
+
+    def get_generation(self) -> int:
+        generation = self.cache.get(self.generation_key)
+        if generation is None:
+            self.cache.add(self.generation_key, 1, timeout=None)
+            generation = self.cache.get(self.generation_key, 1)
+        return generation
+
+    def make_key(self, user_pk, generation=None) -> str:
+        if generation is None:
+            generation = self.get_generation()
+        return f"{self.key_prefix}:status:{generation}:{user_pk}"
+
+    def get(self, user_pk):
+        """
+        Return the cached guest status or ``None`` if it is unknown.
+
+        """
+        is_guest = self.cache.get(self.make_key(user_pk))
+        if is_guest is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return is_guest
+
+    def set(self, user_pk, is_guest: bool):
+        """Store the guest status of a user that was just created or converted."""
+        self.cache.set(self.make_key(user_pk), is_guest, timeout=self.get_timeout())
+
+    def add(self, user_pk, is_guest: bool):
+        """
+        Store the guest status read from the database, unless it is already set.
+
+        A status read before a conversion committed must not overwrite the
+        status stored by the conversion.
+
+        """
+        self.cache.add(self.make_key(user_pk), is_guest, timeout=self.get_timeout())
+
+    def get_timeout(self):
+        return DEFAULT_TIMEOUT if self.timeout is None else self.timeout
+
+    def invalidate(self, user_pk):
+        """Forget the guest status of a single user."""
+        self.cache.delete(self.make_key(user_pk))
+
+    def invalidate_many(self, user_pks):
+        """Forget the guest status of several users."""
+        generation = self.get_generation()
+        self.cache.delete_many([self.make_key(pk, generation) for pk in user_pks])
+
+    def invalidate_all(self):
+        """Forget the guest status of all users by starting a new generation."""
+        try:
+            self.cache.incr(self.generation_key)
+        except ValueError:
+            # The generation expired or was never set.
+            self.cache.add(self.generation_key, 1, timeout=None)
+            self.cache.incr(self.generation_key)
+
+    def stats(self) -> dict:
+        """Return the hit and miss counters of this process."""
+        return {"hits": self.hits, "misses": self.misses}
+
+
+_status_caches = {}
+
+
+def get_status_cache():
+    """
+    Return the configured guest status cache.
+
+    Returns ``None`` if :attr:`GUEST_USER_CACHE<guest_user.app_settings.AppSettings.CACHE>`
+    is not set.
+
+    """
+    alias = settings.CACHE
+    if not alias:
+        return None
+    if alias not in _status_caches:
+        _status_caches[alias] = GuestStatusCache(alias)
+    status_cache = _status_caches[alias]
+    status_cache.timeout = settings.CACHE_TIMEOUT
+    return status_cache
+
+
+def invalidate_guest_status(sender, instance, **kwargs):
+    """
+    Forget the cached status when a Guest instance is deleted.
+
+    Connected to the ``post_delete`` signal of the Guest model when the cache is enabled.
+
+    """
+    status_cache = get_status_cache()
+    if status_cache is not None:
+        status_cache.invalidate(instance.user_id)
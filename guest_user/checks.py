@@ -1,4 +1,6 @@
 from django.conf import settings as django_settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import FieldDoesNotExist
 from django.core.checks import Error, Warning, register
 
 from . import settings
@@ -35,4 +37,18 @@ def check_settings(app_configs, **kwargs):
             )
         )
 
+    if settings.FLAG_FIELD:
+        UserModel = get_user_model()
+        try:
+            UserModel._meta.get_field(settings.FLAG_FIELD)
+        except FieldDoesNotExist:
+            checks.append(
+                Error(
+                    f"The user model has no field named '{settings.FLAG_FIELD}'.",
+                    hint="Add the GuestUserMixin to your user model or change the GUEST_USER_FLAG_FIELD setting.",
+                    obj="settings",
+                    id="guest_user.E002",
+                )
+            )
+
     return checks
@@ -0,0 +1,295 @@
+import logging
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import DatabaseError, connections, transaction
+from django.db.models import Max, Min
+
+from . import settings
+from .functions import get_guest_model
+
+logger = logging.getLogger(__name__)
+
+
+class CleanupStats:
+    """
+    Counters of a cleanup run.
+
+    """
+
+    def __init__(self, worker: int = 0):
+        self.worker = worker
+        self.batches = 0
+        self.guests = 0
+        self.last_batch = 0
+        self.objects = 0
+        self.counts = Counter()
+        self.elapsed = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Guests deleted per second."""
+        return self.guests / self.elapsed if self.elapsed else 0.0
+
+    def add(self, other: "CleanupStats"):
+        self.batches += other.batches
+        self.guests += other.guests
+        self.objects += other.objects
+        self.counts.update(other.counts)
+        self.elapsed = max(self.elapsed, other.elapsed)
+
+
+def delete_pending_guests(queryset, user_ids, archive):
+    """
+    Delete the guests archived by an interrupted run and clear the checkpoint.
+
+    Users that are no longer expired guests, e.g. because they converted, are
+    kept. If the deletion fails, the error is logged and the checkpoint is
+    cleared anyway, so later runs are not blocked by the same batch.
+
+    """
+    user_ids = list(
+        queryset.filter_expired()
+        .filter(user__in=user_ids)
+        .values_list("user", flat=True)
+    )
+    try:
+        with transaction.atomic(using=queryset.db):
+            get_guest_model().objects.delete_users(user_ids)
+    except DatabaseError:
+        logger.exception(
+            "Could not delete the guests pending in %s.", archive.checkpoint
+        )
+    archive.commit()
+
+
+def delete_expired_guests(
+    queryset=None,
+    batch_size: int = None,
+    limit: int = None,
+    deadline: float = None,
+    sleep: float = 0,
+    dry_run: bool = False,
+    skip_locked: bool = False,
+    on_batch=None,
+    stats: CleanupStats = None,
+    archive=None,
+    should_stop=None,
+) -> CleanupStats:
+    """
+    Delete expired guests in batches.
+
+    Each batch is read and deleted in its own transaction.
+
+    :param queryset: Guests to consider, defaults to all guests.
+    :param batch_size: Number of guests per batch.
+    :param limit: Maximum number of guests to delete.
+    :param deadline: Stop after the batch that ends past this :func:`time.monotonic` value.
+    :param sleep: Seconds to wait between batches.
+    :param dry_run: Only count the expired guests.
+    :param skip_locked: Skip guests locked by concurrent cleanups, if supported.
+      Skipped guests are retried once the end of the expired guests is reached.
+    :param on_batch: Called with the stats after each batch.
+    :param stats: Stats instance to update, a new one is created by default.
+    :param archive: A :class:`~guest_user.archive.GuestArchive` to write the
+      guests to before they are deleted.
+    :param should_stop: Called after each batch, stops when it returns True.
+
+    """
+    GuestModel = get_guest_model()
+    if queryset is None:
+        queryset = GuestModel.objects.all()
+    batch_size = batch_size or settings.DELETE_BATCH_SIZE
+    stats = stats or CleanupStats()
+    started = time.monotonic()
+
+    if archive is not None and not dry_run:
+        pending = archive.pending()
+        if pending:
+            delete_pending_guests(queryset, pending, archive)
+
+    locking = skip_locked and not dry_run
+    after = None
+    while limit is None or stats.guests < limit:
+        if limit is not None:
+            batch_size = min(batch_size, limit - stats.guests)
+
+        with transaction.atomic(using=queryset.db):
+            rows = queryset.expired_page(batch_size, after=after, skip_locked=locking)
+            if not rows:
+                if locking and after is not None:
+                    # Retry guests that were skipped while locked.
+                    after = None
+                    continue
+                break
+            user_ids = [user_id for _created_at, user_id in rows]
+            if dry_run:
+                deleted = len(user_ids)
+            else:
+                if archive is not None:
+                    archive.write_batch(user_ids)
+                deleted, counts = GuestModel.objects.delete_users(user_ids)
+                stats.counts.update(counts)
+        if archive is not None and not dry_run:
+            archive.commit()
+
+        after = rows[-1]
+        stats.batches += 1
+        stats.guests += len(user_ids)
+        stats.last_batch = len(user_ids)
+        stats.objects += deleted
+        stats.elapsed = time.monotonic() - started
+        if on_batch is not None:
+            on_batch(stats)
+
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+        if should_stop is not None and should_stop():
+            break
+        if sleep:
+            time.sleep(sleep)
+
+    stats.elapsed = time.monotonic() - started
+    return stats
+
+
+def delete_guests(queryset, batch_size: int = None) -> CleanupStats:
+    """
+    Delete the users of the given guests in batches, regardless of their age.
+
+    Each batch is deleted with a set-based query in its own transaction.
+
+    :param queryset: Guests to delete.
+    :param batch_size: Number of guests per batch.
+
+    """
+    GuestModel = get_guest_model()
+    batch_size = batch_size or settings.DELETE_BATCH_SIZE
+    stats = CleanupStats()
+    started = time.monotonic()
+
+    rows = queryset.order_by("pk").values_list("pk", "user")
+    last = None
+    while True:
+        page = rows if last is None else rows.filter(pk__gt=last)
+        batch = list(page[:batch_size])
+        if not batch:
+            break
+        user_ids = [user_id for _pk, user_id in batch]
+        with transaction.atomic(using=queryset.db):
+            deleted, counts = GuestModel.objects.delete_users(user_ids)
+        last = batch[-1][0]
+        stats.batches += 1
+        stats.guests += len(user_ids)
+        stats.last_batch = len(user_ids)
+        stats.objects += deleted
+        stats.counts.update(counts)
+
+    stats.elapsed = time.monotonic() - started
+    return stats
+
+
+def split_expired_range(workers: int, queryset=None) -> list:
+    """
+    Split the expired guests into disjoint ranges of Guest primary keys.
+
+    Guest models with a non-integer primary key are not split.
+
+    :returns: A list of up to ``workers`` querysets.
+
+    """
+    if queryset is None:
+        queryset = get_guest_model().objects.all()
+    bounds = queryset.filter_expired().aggregate(low=Min("pk"), high=Max("pk"))
+    low, high = bounds["low"], bounds["high"]
+    if low is None:
+        return []
+    if not isinstance(low, int):
+        # Non-integer keys can't be split into ranges.
+        return [queryset]
+
+    step = max(1, -(-(high - low + 1) // workers))
+    return [
+        queryset.filter(pk__gte=start, pk__lt=start + step)
+        for start in range(low, high + 1, step)
+    ]
+
+
+def delete_expired_parallel(workers: int, limit: int = None, **kwargs) -> list:
+    """
+    Delete expired guests with several threads, each with its own database connection.
+
+    The expired guests are split into disjoint ranges of Guest primary keys, one
+    per worker.
+    On SQLite, which allows a single writer, the ranges are processed one at a time.
+    Accepts the same keyword arguments as :func:`delete_expired_guests`.
+
+    A ``limit`` is split between the workers. The share of workers that run out
+    of expired guests is passed on to the workers that used up their share.
+
+    :returns: The stats of each worker.
+
+    """
+    queryset = kwargs.pop("queryset", None)
+    if queryset is None:
+        queryset = get_guest_model().objects.all()
+    partitions = split_expired_range(workers, queryset)
+
+    def run(queryset, stats, worker_limit):
+        elapsed = stats.elapsed
+        try:
+            delete_expired_guests(
+                queryset=queryset, limit=worker_limit, stats=stats, **kwargs
+            )
+        finally:
+            connections.close_all()
+        stats.elapsed += elapsed
+        return stats
+
+    max_workers = max(len(partitions), 1)
+    if connections[queryset.db].vendor == "sqlite":
+        # SQLite allows a single writer at a time.
+        max_workers = 1
+
+    results = [CleanupStats(worker) for worker in range(1, len(partitions) + 1)]
+    active = list(zip(partitions, results))
+    remaining = limit
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while active:
+            shares = [None] * len(active)
+            if remaining is not None:
+                share, remainder = divmod(remaining, len(active))
+                shares = [share + (i < remainder) for i in range(len(active))]
+            started = [stats.guests for _partition, stats in active]
+            futures = [
+                executor.submit(
+                    run, partition, stats, None if share is None else start + share
+                )
+                for (partition, stats), start, share in zip(active, started, shares)
+            ]
+            for future in futures:
+                future.result()
+            if remaining is None:
+                break
+
+            # Spread the limit left over by partitions with fewer expired
+            # guests to the partitions that used up their share.
+            deleted = [
+                stats.guests - start for (_p, stats), start in zip(active, started)
+            ]
+            remaining -= sum(deleted)
+            active = [
+                item
+                for item, count, share in zip(active, deleted, shares)
+                if share and count >= share
+            ]
+            deadline = kwargs.get("deadline")
+            if remaining <= 0 or (
+                deadline is not None and time.monotonic() >= deadline
+            ):
+                break
+            should_stop = kwargs.get("should_stop")
+            if should_stop is not None and should_stop():
+                break
+    return results
@@ -0,0 +1,13 @@
+from django.utils.functional import SimpleLazyObject
+
+from .functions import is_guest_request
+
+
+def guest_user(request):
+    """
+    Add ``is_guest`` to the template context.
+
+    The guest status is evaluated lazily and shared with ``request.is_guest``.
+
+    """
+    return {"is_guest": SimpleLazyObject(lambda: is_guest_request(request))}
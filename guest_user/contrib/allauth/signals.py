@@ -1,9 +1,13 @@
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.dispatch import Signal, receiver
 
 from allauth.socialaccount.signals import social_account_added
 
-from ...functions import get_guest_model, is_guest_user
+from ... import settings
+from ...cache import get_status_cache
+from ...functions import GUEST_STATUS_ATTR, get_guest_model, is_guest_user
+from ...sessions import store_guest_status
 
 
 @receiver(social_account_added)
@@ -19,32 +23,45 @@ def convert_guest_with_social_login(sender, request, sociallogin, **kwargs):
     user = request.user
 
     if is_guest_user(user):
+        from allauth.account.adapter import get_adapter as get_account_adapter
+        from allauth.socialaccount.adapter import get_adapter as get_social_adapter
+
         # Convert the user right away, since the social account
         # has already been connected at this point.
-        get_guest_model().objects.filter(user=user).delete()
+        with transaction.atomic():
+            deleted, _counts = get_guest_model().objects.filter(user=user).delete()
+            if not deleted:
+                # The guest is being deleted, e.g. from a detached partition.
+                return
 
-        from allauth.account.adapter import get_adapter as get_account_adapter
-        from allauth.socialaccount.adapter import get_adapter as get_social_adapter
+            # Normally, allauth will only populate a user that registers using a social account,
+            # but in this case the user already exists, so we need to populate it ourselves.
+            social_adapter = get_social_adapter()
+            social_adapter.populate_user(
+                request,
+                sociallogin,
+                sociallogin.account.get_provider().extract_common_fields(
+                    sociallogin.account.extra_data
+                ),
+            )
+            account_adapter = get_account_adapter()
+            try:
+                username = getattr(user, user.USERNAME_FIELD)
+                account_adapter.clean_username(username)
+            except ValidationError:
+                # Empty the invalid username to allow fallbacks in `populate_username`
+                setattr(user, user.USERNAME_FIELD, "")
+            account_adapter.populate_username(request, user)
+            if settings.FLAG_FIELD:
+                setattr(user, settings.FLAG_FIELD, False)
+            user.save()
 
-        # Normally, allauth will only populate a user that registers using a social account,
-        # but in this case the user already exists, so we need to populate it ourselves.
-        social_adapter = get_social_adapter()
-        social_adapter.populate_user(
-            request,
-            sociallogin,
-            sociallogin.account.get_provider().extract_common_fields(
-                sociallogin.account.extra_data
-            ),
-        )
-        account_adapter = get_account_adapter()
-        try:
-            username = getattr(user, user.USERNAME_FIELD)
-            account_adapter.clean_username(username)
-        except ValidationError:
-            # Empty the invalid username to allow fallbacks in `populate_username`
-            setattr(user, user.USERNAME_FIELD, "")
-        account_adapter.populate_username(request, user)
-        user.save()
+        setattr(user, GUEST_STATUS_ATTR, False)
+        status_cache = get_status_cache()
+        if status_cache is not None:
+            status_cache.set(user.pk, False)
+        if hasattr(request, "session"):
+            store_guest_status(request, user, is_guest=False)
 
         converted_social_account.send(sender=sender, user=user, sociallogin=sociallogin)
 
@@ -1,9 +1,11 @@
 from tos.middleware import UserAgreementMiddleware
-from guest_user.functions import is_guest_user
+from guest_user.sessions import is_guest_session
 
 
 class GuestUserAgreementMiddleware(UserAgreementMiddleware):
     def should_fast_skip(self, request):
         if super().should_fast_skip(request):
             return True
-        return is_guest_user(request.user)
+        # The guest status is read from the session, like the checks of the
+        # parent middleware, so the user is not loaded from the database.
+        return is_guest_session(request)
@@ -0,0 +1,227 @@
+"""
+Database constraints with ``ON DELETE CASCADE`` for data owned by guest users.
+
+"""
+import os
+from typing import List, Optional, Tuple
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.db import connections, migrations
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.writer import MigrationWriter
+
+from . import settings
+from .deletion import DeletionPlanner
+from .functions import get_guest_model
+
+POSTGRESQL_RULES = {
+    "a": "NO ACTION",
+    "r": "RESTRICT",
+    "c": "CASCADE",
+    "n": "SET NULL",
+    "d": "SET DEFAULT",
+}
+
+
+class CascadeError(Exception):
+    """
+    The database constraints can't be inspected or changed.
+    """
+
+
+def get_relations() -> List[Tuple]:
+    """
+    Return the foreign keys followed when deleting users with the rule they
+    need in the database: ``"CASCADE"``, ``"SET NULL"`` or ``None`` if the
+    relation can only be handled in Python.
+
+    """
+    planner = DeletionPlanner(get_user_model())
+    if not planner.supported:
+        raise CascadeError(planner.reason)
+
+    relations = []
+
+    def walk(step):
+        for update, default_field in step.updates:
+            relations.append((update.field, None if default_field else "SET NULL"))
+        for child in step.children:
+            relations.append((child.field, "CASCADE"))
+            walk(child)
+
+    walk(planner.root)
+    return relations
+
+
+def get_database_rule(connection, field) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Return the name and ``ON DELETE`` rule of the constraint of a foreign key.
+
+    :returns: ``(None, None)`` if there is no constraint or constraints
+      can't be inspected on the database, so the relation is handled in Python.
+
+    """
+    if connection.vendor not in ("postgresql", "mysql", "sqlite"):
+        return None, None
+    table = field.model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(
+                "SELECT con.conname, con.confdeltype FROM pg_constraint con "
+                "JOIN pg_attribute att ON att.attrelid = con.conrelid "
+                "AND att.attnum = ANY(con.conkey) "
+                "WHERE con.contype = 'f' AND con.conrelid = to_regclass(%s) "
+                "AND att.attname = %s",
+                [table, field.column],
+            )
+            row = cursor.fetchone()
+            return (row[0], POSTGRESQL_RULES[row[1]]) if row else (None, None)
+        if connection.vendor == "mysql":
+            cursor.execute(
+                "SELECT rc.CONSTRAINT_NAME, rc.DELETE_RULE "
+                "FROM information_schema.REFERENTIAL_CONSTRAINTS rc "
+                "JOIN information_schema.KEY_COLUMN_USAGE k "
+                "ON k.CONSTRAINT_SCHEMA = rc.CONSTRAINT_SCHEMA "
+                "AND k.CONSTRAINT_NAME = rc.CONSTRAINT_NAME "
+                "WHERE rc.CONSTRAINT_SCHEMA = DATABASE() "
+                "AND k.TABLE_NAME = %s AND k.COLUMN_NAME = %s",
+                [table, field.column],
+            )
+            row = cursor.fetchone()
+            return (row[0], row[1]) if row else (None, None)
+        if connection.vendor == "sqlite":
+            cursor.execute(
+                f"PRAGMA foreign_key_list({connection.ops.quote_name(table)})"
+            )
+            for row in cursor.fetchall():
+                if row[3] == field.column:
+                    return None, row[6]
+            return None, None
+
+
+def get_report(using: str = "default") -> List[Tuple]:
+    """
+    Return the relations followed when deleting users with the rule they need
+    and their rule in the database.
+
+    """
+    connection = connections[using]
+    return [
+        (field, needed, get_database_rule(connection, field)[1])
+        for field, needed in get_relations()
+    ]
+
+
+def get_database_fields(using: str = "default") -> set:
+    """
+    Return the foreign keys that are handled by their database constraint.
+
+    """
+    return {
+        field for field, needed, rule in get_report(using) if needed and needed == rule
+    }
+
+
+def get_opted_in_models() -> set:
+    return {get_guest_model()} | {
+        apps.get_model(label) for label in settings.DB_CASCADE_MODELS
+    }
+
+
+def get_constraint_sql(connection, field, name, rule) -> str:
+    """
+    Return the SQL that adds the foreign key constraint of a field.
+
+    :param rule: The ``ON DELETE`` rule or ``None``.
+
+    """
+    qn = connection.ops.quote_name
+    target = field.target_field
+    sql = (
+        f"ALTER TABLE {qn(field.model._meta.db_table)} "
+        f"ADD CONSTRAINT {qn(name)} FOREIGN KEY ({qn(field.column)}) "
+        f"REFERENCES {qn(target.model._meta.db_table)} ({qn(target.column)})"
+    )
+    if rule:
+        sql += f" ON DELETE {rule}"
+    if connection.features.can_defer_constraint_checks:
+        sql += " DEFERRABLE INITIALLY DEFERRED"
+    return sql
+
+
+def get_drop_constraint_sql(connection, field, name) -> str:
+    qn = connection.ops.quote_name
+    keyword = "FOREIGN KEY" if connection.vendor == "mysql" else "CONSTRAINT"
+    return f"ALTER TABLE {qn(field.model._meta.db_table)} DROP {keyword} {qn(name)}"
+
+
+def get_operations(using: str = "default") -> List:
+    """
+    Return migration operations that replace the foreign key constraints of the
+    opted-in models with constraints cascading in the database.
+
+    """
+    connection = connections[using]
+    if connection.vendor not in ("postgresql", "mysql"):
+        raise CascadeError(
+            f"Changing foreign key constraints on {connection.vendor} is not supported."
+        )
+
+    opted_in = get_opted_in_models()
+    operations = []
+    for field, needed, rule in get_report(using):
+        if not needed or needed == rule or field.model not in opted_in:
+            continue
+        name, _rule = get_database_rule(connection, field)
+        if name is None:
+            name = f"{field.model._meta.db_table}_{field.column}_fk_cascade"[:63]
+            forward, backward = [], []
+        else:
+            forward = [get_drop_constraint_sql(connection, field, name)]
+            backward = [get_constraint_sql(connection, field, name, rule)]
+        operations.append(
+            migrations.RunSQL(
+                sql=forward + [get_constraint_sql(connection, field, name, needed)],
+                reverse_sql=[get_drop_constraint_sql(connection, field, name)]
+                + backward,
+            )
+        )
+    return operations
+
+
+def write_migration(app_label: str, name: str = None, using: str = "default"):
+    """
+    Write a migration with the operations of :func:`get_operations` to an app.
+
+    :returns: The path of the migration or ``None`` if nothing needs to change.
+
+    """
+    operations = get_operations(using)
+    if not operations:
+        return None
+
+    loader = MigrationLoader(None, ignore_no_migrations=True)
+    graph = loader.graph
+    dependencies = set(graph.leaf_nodes(app_label))
+    for operation_models in [get_opted_in_models(), {get_user_model()}]:
+        for model in operation_models:
+            dependencies.update(graph.leaf_nodes(model._meta.app_label))
+
+    leaves = graph.leaf_nodes(app_label)
+    number = int(leaves[0][1].split("_")[0]) + 1 if leaves else 1
+    migration = migrations.Migration(
+        f"{number:04d}_{name or 'guest_user_db_cascade'}", app_label
+    )
+    migration.dependencies = sorted(
+        dependency
+        for dependency in dependencies
+        if dependency[0] in loader.migrated_apps
+    )
+    migration.operations = operations
+
+    writer = MigrationWriter(migration)
+    os.makedirs(os.path.dirname(writer.path), exist_ok=True)
+    with open(writer.path, "w", encoding="utf-8") as f:
+        f.write(writer.as_string())
+    return writer.path
@@ -5,7 +5,7 @@ from django.contrib.auth import REDIRECT_FIELD_NAME
 from django.shortcuts import redirect
 
 from . import settings
-from .functions import is_guest_user, maybe_create_guest_user, redirect_with_next
+from .functions import is_guest_request, maybe_create_guest_user, redirect_with_next
 
 
 def allow_guest_user(function=None):
@@ -65,7 +65,7 @@ def guest_user_required(
     def decorator(view_func):
         @wraps(view_func)
         def wrapper(request, *args, **kwargs):
-            if is_guest_user(request.user):
+            if is_guest_request(request):
                 return view_func(request, *args, **kwargs)
             if request.user.is_anonymous:
                 redirect_url = anonymous_url or settings.REQUIRED_ANON_URL
@@ -117,7 +117,7 @@ def regular_user_required(
         @wraps(view_func)
         def wrapper(request, *args, **kwargs):
             user = request.user
-            if user.is_authenticated and not is_guest_user(user):
+            if user.is_authenticated and not is_guest_request(request):
                 return view_func(request, *args, **kwargs)
             if user.is_anonymous:
                 redirect_url = login_url or django_settings.LOGIN_URL
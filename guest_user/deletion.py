@@ -0,0 +1,314 @@
+from collections import Counter
+from typing import Dict, Tuple
+
+from django.contrib.auth import get_user_model
+from django.db import models, transaction
+from django.db.models import signals
+
+from . import settings
+
+
+def get_candidate_relations(opts):
+    """
+    Return the reverse relations of a model that are followed by deletions.
+
+    Matches the relations collected by Django's deletion collector.
+
+    """
+    return [
+        field
+        for field in opts.get_fields(include_hidden=True)
+        if field.auto_created
+        and not field.concrete
+        and (field.one_to_one or field.one_to_many)
+    ]
+
+
+def count_deleted_objects(queryset) -> Tuple[Dict, Dict]:
+    """
+    Count the objects that would be deleted with a queryset, per model.
+
+    Cascading relations are followed with one aggregate query per relation,
+    without loading any objects. Relations back to a model already on the
+    current path are not followed again, so counts of self-referencing
+    models may be too low. Restricted relations are reported as protected.
+
+    :returns: A dict of models to the number of deleted objects and a dict of
+      models to the number of objects protecting the deletion.
+
+    """
+    counts = {}
+    protected = {}
+
+    def collect(queryset, path):
+        model = queryset.model
+        count = queryset.count()
+        if not count:
+            return
+        counts[model] = counts.get(model, 0) + count
+
+        for relation in get_candidate_relations(model._meta):
+            related_model = relation.related_model
+            on_delete = relation.field.remote_field.on_delete
+            related = related_model._base_manager.filter(
+                **{
+                    f"{relation.field.name}__in": queryset.values(
+                        relation.field.remote_field.field_name
+                    )
+                }
+            )
+            if on_delete is models.CASCADE and related_model not in path:
+                collect(related, path | {related_model})
+            elif on_delete in (models.PROTECT, models.RESTRICT):
+                protected_count = related.count()
+                if protected_count:
+                    protected[related_model] = (
+                        protected.get(related_model, 0) + protected_count
+                    )
+
+    collect(queryset, {queryset.model})
+    return counts, protected
+
+
+class UnsupportedRelation(Exception):
+    """
+    A relation can't be handled by the deletion planner.
+    """
+
+
+class DeletionStep:
+    """
+    A model in the cascade of a deletion, with its reverse relations.
+
+    :param model: The model of the deleted rows.
+    :param field: The foreign key of ``model`` that leads to the parent step,
+      or ``None`` for the root.
+
+    """
+
+    def __init__(self, model, field=None):
+        self.model = model
+        self.field = field
+        self.children = []
+        self.updates = []
+        self.protected = []
+
+    def filter(self, parent_queryset):
+        """
+        Return the rows of this step that reference the rows of the parent step.
+
+        """
+        return self.model._base_manager.filter(
+            **{
+                f"{self.field.name}__in": parent_queryset.values(
+                    self.field.remote_field.field_name
+                )
+            }
+        )
+
+
+class DeletionPlanner:
+    """
+    Delete rows of a model and everything that cascades from them with bulk queries.
+
+    The reverse relations of the model are introspected once, when the planner
+    is created. Deleting then issues one query per relation, deleting the
+    deepest relations first. Only models with ``pre_delete`` or ``post_delete``
+    receivers are loaded to send their signals. As with the collector, all
+    ``pre_delete`` signals are sent before the first row is deleted.
+
+    Relations that are handled differently by Django's deletion collector make
+    the planner unsupported: generic relations, multi-table inheritance outside
+    of the cascade and relations back to a model already in the cascade.
+    :meth:`delete` then falls back to :meth:`QuerySet.delete()<django.db.models.query.QuerySet.delete>`.
+    Protected and restricted rows also use the fallback, which raises the
+    same errors as Django.
+
+    Relations that are cascaded by the database itself can be passed as
+    ``database_fields``. They are left to the database if everything below them
+    is handled by the database as well. Signals are not sent for these models.
+
+    :param model: The model of the deleted rows.
+    :param database_fields: Foreign keys with a matching ``ON DELETE CASCADE``
+      or ``ON DELETE SET NULL`` constraint in the database.
+
+    """
+
+    def __init__(self, model, database_fields=()):
+        self.model = model
+        self.database_fields = set(database_fields)
+        try:
+            self.root = self.plan(model, None, {model})
+            self.supported = True
+        except UnsupportedRelation as e:
+            self.root = None
+            self.supported = False
+            self.reason = str(e)
+
+    def plan(self, model, field, path) -> DeletionStep:
+        opts = model._meta
+        if any(hasattr(f, "bulk_related_objects") for f in opts.private_fields):
+            raise UnsupportedRelation(f"{opts.label} has generic relations.")
+        if any(link != field for link in opts.concrete_model._meta.parents.values()):
+            raise UnsupportedRelation(f"{opts.label} inherits from another model.")
+
+        step = DeletionStep(model, field)
+        for relation in get_candidate_relations(opts):
+            related_model = relation.related_model
+            related_field = relation.field
+            on_delete = related_field.remote_field.on_delete
+            if on_delete is models.DO_NOTHING:
+                continue
+            if on_delete is models.CASCADE:
+                if related_model in path:
+                    raise UnsupportedRelation(
+                        f"{related_model._meta.label} cascades back to itself."
+                    )
+                child = self.plan(related_model, related_field, path | {related_model})
+                if not (
+                    related_field in self.database_fields
+                    and not (child.children or child.updates or child.protected)
+                ):
+                    step.children.append(child)
+            elif on_delete in (models.PROTECT, models.RESTRICT):
+                step.protected.append(DeletionStep(related_model, related_field))
+            elif on_delete is models.SET_NULL:
+                if related_field not in self.database_fields:
+                    step.updates.append(
+                        (DeletionStep(related_model, related_field), None)
+                    )
+            elif on_delete is models.SET_DEFAULT:
+                step.updates.append(
+                    (DeletionStep(related_model, related_field), related_field)
+                )
+            else:
+                raise UnsupportedRelation(
+                    f"{related_model._meta.label}.{related_field.name} uses an "
+                    "unsupported on_delete handler."
+                )
+        return step
+
+    def iter_steps(self, step, queryset):
+        """
+        Yield the steps and their querysets, children before their parents.
+
+        """
+        for child in step.children:
+            yield from self.iter_steps(child, child.filter(queryset))
+        yield step, queryset
+
+    def is_protected(self, queryset) -> bool:
+        for step, step_queryset in self.iter_steps(self.root, queryset):
+            for protected in step.protected:
+                if protected.filter(step_queryset).exists():
+                    return True
+        return False
+
+    def delete(self, queryset) -> Tuple[int, Dict[str, int]]:
+        """
+        Delete the rows of a queryset and everything that cascades from them.
+
+        :returns: The number of deleted objects and a dict with the count per model,
+          like :meth:`QuerySet.delete()<django.db.models.query.QuerySet.delete>`.
+
+        """
+        if not self.supported or self.is_protected(queryset):
+            return queryset.delete()
+
+        using = queryset.db
+        counts = Counter()
+        with transaction.atomic(using=using, savepoint=False):
+            # Like the collector, send all pre_delete signals before anything
+            # is deleted, so receivers still see the related rows.
+            steps = [
+                (step, step_queryset, self.load_instances(step, step_queryset))
+                for step, step_queryset in self.iter_steps(self.root, queryset)
+            ]
+            for step, _step_queryset, instances in steps:
+                for obj in instances or ():
+                    signals.pre_delete.send(
+                        sender=step.model, instance=obj, using=using, origin=queryset
+                    )
+
+            for step, step_queryset, instances in steps:
+                for update, default_field in step.updates:
+                    value = (
+                        None if default_field is None else default_field.get_default()
+                    )
+                    update.filter(step_queryset).update(**{update.field.name: value})
+
+                count = self.delete_step(step, step_queryset, instances, queryset)
+                if count:
+                    counts[step.model._meta.label] += count
+        return sum(counts.values()), dict(counts)
+
+    def load_instances(self, step, queryset):
+        """
+        Return the objects of a step if its model has delete signal receivers,
+        otherwise ``None``.
+
+        """
+        model = step.model
+        if model._meta.auto_created or not (
+            signals.pre_delete.has_listeners(model)
+            or signals.post_delete.has_listeners(model)
+        ):
+            return None
+        return list(queryset)
+
+    def delete_step(self, step, queryset, instances, origin) -> int:
+        if instances is None:
+            return queryset._raw_delete(queryset.db)
+        if not instances:
+            return 0
+
+        model = step.model
+        using = queryset.db
+        count = (
+            model._base_manager.using(using)
+            .filter(pk__in=[obj.pk for obj in instances])
+            ._raw_delete(using)
+        )
+        for obj in instances:
+            signals.post_delete.send(
+                sender=model, instance=obj, using=using, origin=origin
+            )
+            setattr(obj, model._meta.pk.attname, None)
+        return count
+
+
+_user_deletion_planners = {}
+
+
+def get_user_deletion_planner(using: str = None) -> DeletionPlanner:
+    """
+    Return the deletion planner of the user model, built on first use.
+
+    With :attr:`GUEST_USER_DB_CASCADE<guest_user.app_settings.AppSettings.DB_CASCADE>`
+    the constraints of the database given by ``using`` are inspected to leave
+    cascading relations to the database. Planners are kept until
+    :func:`clear_user_deletion_planners` is called.
+
+    """
+    key = (using or "default", settings.DB_CASCADE)
+    planner = _user_deletion_planners.get(key)
+    if planner is None:
+        database_fields = ()
+        if key[1]:
+            from .db_cascade import get_database_fields
+
+            database_fields = get_database_fields(key[0])
+        planner = DeletionPlanner(get_user_model(), database_fields)
+        _user_deletion_planners[key] = planner
+    return planner
+
+
+def clear_user_deletion_planners(**kwargs):
+    """
+    Forget the built deletion planners, so the constraints are inspected again.
+
+    Called after migrations and at the start of each cleanup run, because a
+    migration may have changed the constraints.
+
+    """
+    _user_deletion_planners.clear()
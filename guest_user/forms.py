@@ -32,15 +32,33 @@ class UserCreationForm(BaseUserCreationForm):
     def save(self, commit=True):
         """
         Save the form and properly convert guest user to regular user.
+
+        :raises NotGuestError: If the user is a guest whose Guest instance
+          no longer exists, e.g. while it is deleted from a detached partition.
+
         """
-        user = super().save(commit=commit)
+        # Import here to avoid circular imports
+        from django.db import transaction
+
+        from . import settings
+        from .exceptions import NotGuestError
+        from .functions import GUEST_STATUS_ATTR, get_guest_model, is_guest_user
 
-        if commit and self.instance:
-            # Import here to avoid circular imports
-            from .functions import get_guest_model
+        if not commit or self.instance.pk is None:
+            if settings.FLAG_FIELD:
+                setattr(self.instance, settings.FLAG_FIELD, False)
+            return super().save(commit=commit)
 
+        was_guest = is_guest_user(self.instance)
+        with transaction.atomic():
             # Remove the guest instance if it exists
             GuestModel = get_guest_model()
-            GuestModel.objects.filter(user=user).delete()
+            deleted, _counts = GuestModel.objects.filter(user=self.instance).delete()
+            if was_guest and not deleted:
+                raise NotGuestError("The guest user no longer exists")
 
+            if settings.FLAG_FIELD:
+                setattr(self.instance, settings.FLAG_FIELD, False)
+            user = super().save(commit=commit)
+        setattr(user, GUEST_STATUS_ATTR, False)
         return user
@@ -5,9 +5,23 @@ from urllib.parse import urlparse
 from django.apps import apps as django_apps
 from django.contrib.auth import authenticate, get_user_model, login
 from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Exists, F, OuterRef
 from django.shortcuts import resolve_url
+from django.utils.functional import SimpleLazyObject
 
 from . import settings
+from .bloom import guest_id_filter
+from .cache import get_status_cache
+
+GUEST_STATUS_ATTR = "_is_guest"
+"""
+Attribute holding a precomputed guest status on user instances.
+
+It is set by :func:`with_guest_status` and read by :func:`is_guest_user`.
+
+:meta private:
+
+"""
 
 
 def maybe_create_guest_user(request):
@@ -68,11 +82,115 @@ def is_guest_user(user) -> bool:
     if user.is_anonymous:
         return False
 
+    is_guest = getattr(user, GUEST_STATUS_ATTR, None)
+    if is_guest is not None:
+        return is_guest
+
+    if settings.FLAG_FIELD:
+        return getattr(user, settings.FLAG_FIELD)
+
     if getattr(user, "backend", None) == "guest_user.backends.GuestBackend":
         return True
 
+    if settings.BLOOM_FILTER and guest_id_filter.is_not_guest(user.pk):
+        return False
+
+    status_cache = get_status_cache()
+    if status_cache is not None:
+        is_guest = status_cache.get(user.pk)
+        if is_guest is not None:
+            return is_guest
+
     GuestModel = get_guest_model()
-    return GuestModel.objects.filter(user=user).exists()
+    is_guest = GuestModel.objects.filter(user=user).exists()
+    if status_cache is not None:
+        status_cache.add(user.pk, is_guest)
+    return is_guest
+
+
+def is_guest_request(request) -> bool:
+    """
+    Check if the current request was made by a temporary guest.
+
+    The result is stored as ``request.is_guest``, so the guest status
+    is evaluated at most once per request.
+
+    """
+    if not hasattr(request, "is_guest"):
+        request.is_guest = lazy_guest_status(request)
+    return bool(request.is_guest)
+
+
+def lazy_guest_status(request):
+    """
+    Return a lazy object evaluating the guest status of ``request.user``.
+
+    :meta private:
+
+    """
+    return SimpleLazyObject(lambda: is_guest_user(request.user))
+
+
+def with_guest_status(queryset):
+    """
+    Annotate a user queryset with the guest status of each user.
+
+    The status is computed in the same query using an ``EXISTS`` subquery,
+    so :func:`is_guest_user` will not issue another query for the returned users.
+
+    Usage example::
+
+        from guest_user.functions import is_guest_user, with_guest_status
+
+        for user in with_guest_status(User.objects.all()):
+            print(user, is_guest_user(user))
+
+    :param queryset: A queryset or manager of the user model.
+    :returns: The annotated queryset.
+
+    """
+    if settings.FLAG_FIELD:
+        return queryset.annotate(**{GUEST_STATUS_ATTR: F(settings.FLAG_FIELD)})
+
+    GuestModel = get_guest_model()
+    return queryset.annotate(
+        **{GUEST_STATUS_ATTR: Exists(GuestModel.objects.filter(user=OuterRef("pk")))}
+    )
+
+
+def prefetch_guest_status(users) -> set:
+    """
+    Resolve the guest status for a collection of users with a single query.
+
+    Each user instance is updated with its status, so that following calls to
+    :func:`is_guest_user` for these instances do not query the database.
+    Users with an already known guest status are not queried again.
+
+    :param users: An iterable of user instances. ``None`` and anonymous users are skipped.
+    :returns: The primary keys of all guest users in the collection.
+
+    """
+    users = [user for user in users if user is not None and not user.is_anonymous]
+    if settings.FLAG_FIELD:
+        return {user.pk for user in users if is_guest_user(user)}
+
+    pending = {
+        user.pk for user in users if getattr(user, GUEST_STATUS_ATTR, None) is None
+    }
+
+    guest_pks = set()
+    if pending:
+        GuestModel = get_guest_model()
+        guest_pks = set(
+            GuestModel.objects.filter(user__in=pending).values_list("user", flat=True)
+        )
+
+    for user in users:
+        if user.pk in pending:
+            setattr(user, GUEST_STATUS_ATTR, user.pk in guest_pks)
+        elif getattr(user, GUEST_STATUS_ATTR):
+            guest_pks.add(user.pk)
+    return guest_pks
 
 
 def generate_uuid_username(**kwargs) -> str:
@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Exists, OuterRef
+
+from ... import settings
+from ...functions import get_guest_model
+
+
+class Command(BaseCommand):
+    help = "Set the guest flag field on the user model from existing Guest instances."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of users updated per query.",
+        )
+
+    def handle(self, batch_size, verbosity, **options):
+        field = settings.FLAG_FIELD
+        if not field:
+            raise CommandError("The GUEST_USER_FLAG_FIELD setting is not set.")
+
+        GuestModel = get_guest_model()
+        UserModel = get_user_model()
+        users = UserModel._default_manager.order_by()
+
+        flagged = 0
+        guest_ids = GuestModel.objects.order_by("user").values_list("user", flat=True)
+        for chunk in self.chunks(guest_ids, "user", batch_size):
+            flagged += (
+                users.filter(pk__in=chunk)
+                .exclude(**{field: True})
+                .update(**{field: True})
+            )
+
+        unflagged = 0
+        flagged_ids = (
+            users.filter(**{field: True}).order_by("pk").values_list("pk", flat=True)
+        )
+        has_guest = Exists(GuestModel.objects.filter(user=OuterRef("pk")))
+        for chunk in self.chunks(flagged_ids, "pk", batch_size):
+            unflagged += (
+                users.filter(pk__in=chunk).exclude(has_guest).update(**{field: False})
+            )
+
+        if verbosity >= 1:
+            self.stdout.write(
+                f"Flagged {flagged} guest users, unflagged {unflagged} registered users."
+            )
+
+    @staticmethod
+    def chunks(queryset, key, batch_size):
+        """Yield lists of primary keys using keyset pagination."""
+        last = None
+        while True:
+            page = queryset
+            if last is not None:
+                page = page.filter(**{f"{key}__gt": last})
+            chunk = list(page[:batch_size])
+            if not chunk:
+                return
+            yield chunk
+            last = chunk[-1]
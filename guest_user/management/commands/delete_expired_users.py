@@ -1,12 +1,131 @@
-from django.core.management.base import BaseCommand
+import time
 
-from ...functions import get_guest_model
+from django.core.management.base import BaseCommand, CommandError
+
+from ...archive import GuestArchive
+from ...cleanup import CleanupStats, delete_expired_guests, delete_expired_parallel
+from ...deletion import clear_user_deletion_planners
 
 
 class Command(BaseCommand):
     help = "Delete expired guest users."
 
-    def handle(self, **options):
-        """Delete every user"""
-        GuestModel = get_guest_model()
-        GuestModel.objects.delete_expired()
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Number of guests deleted per query. "
+            "Defaults to the GUEST_USER_DELETE_BATCH_SIZE setting.",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=None,
+            help="Maximum number of guests to delete.",
+        )
+        parser.add_argument(
+            "--max-runtime",
+            type=float,
+            default=None,
+            help="Stop after this many seconds. The current batch is always completed.",
+        )
+        parser.add_argument(
+            "--sleep-between-batches",
+            type=float,
+            default=0,
+            help="Seconds to wait between batches to reduce database load.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count the expired guests without deleting them.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of parallel workers, each with its own database connection.",
+        )
+        parser.add_argument(
+            "--archive",
+            default=None,
+            help="Append the expired guests and the rows of GUEST_USER_ARCHIVE_MODELS "
+            "to this gzip compressed JSONL file before deleting them.",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            default=None,
+            help="Checkpoint file used to resume an interrupted archive run. "
+            "Defaults to the archive path with a .checkpoint suffix.",
+        )
+
+    def handle(
+        self,
+        batch_size,
+        limit,
+        max_runtime,
+        sleep_between_batches,
+        dry_run,
+        workers,
+        archive,
+        checkpoint,
+        verbosity,
+        **options,
+    ):
+        """Delete expired guests in batches."""
+        if archive and workers > 1:
+            raise CommandError("--archive can't be combined with --workers.")
+        clear_user_deletion_planners()
+        started = time.monotonic()
+        deadline = started + max_runtime if max_runtime is not None else None
+
+        def on_batch(stats):
+            if verbosity >= 2:
+                prefix = f"Worker {stats.worker}, batch" if workers > 1 else "Batch"
+                self.stdout.write(
+                    f"{prefix} {stats.batches}: {stats.last_batch} guests, "
+                    f"{stats.guests} total in {stats.elapsed:.1f}s"
+                )
+
+        options = dict(
+            batch_size=batch_size,
+            limit=limit,
+            deadline=deadline,
+            sleep=sleep_between_batches,
+            dry_run=dry_run,
+            skip_locked=True,
+            on_batch=on_batch,
+        )
+        if archive:
+            archive = GuestArchive(archive, checkpoint=checkpoint)
+        if workers > 1:
+            results = delete_expired_parallel(workers, **options)
+        else:
+            results = [delete_expired_guests(archive=archive, **options)]
+
+        total = CleanupStats()
+        for stats in results:
+            total.add(stats)
+
+        if verbosity < 1:
+            return
+        if deadline is not None and time.monotonic() >= deadline:
+            self.stdout.write(f"Stopping after {time.monotonic() - started:.1f}s.")
+        if dry_run:
+            self.stdout.write(f"Would delete {total.guests} expired guests.")
+            return
+
+        self.stdout.write(
+            f"Deleted {total.guests} expired guests ({total.objects} objects in total)."
+        )
+        for label, count in sorted(total.counts.items()):
+            self.stdout.write(f"  {label}: {count}")
+        if archive:
+            self.stdout.write(f"Archived {archive.rows} rows to {archive.path}.")
+        if workers > 1:
+            for stats in results:
+                self.stdout.write(
+                    f"  Worker {stats.worker}: {stats.guests} guests "
+                    f"({stats.throughput:.1f}/s)"
+                )
@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ...db_cascade import CascadeError, get_report, write_migration
+
+
+class Command(BaseCommand):
+    help = (
+        "Report which relations of guest users are cascaded by the database "
+        "and generate migrations adding ON DELETE CASCADE constraints."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--makemigration",
+            metavar="APP_LABEL",
+            default=None,
+            help="Write a migration to this app that adds the missing constraints "
+            "for the Guest model and GUEST_USER_DB_CASCADE_MODELS.",
+        )
+        parser.add_argument(
+            "--name",
+            default=None,
+            help="Name of the generated migration.",
+        )
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Exit with an error if any relation is still handled in Python.",
+        )
+        parser.add_argument(
+            "--database",
+            default="default",
+            help="The database to inspect.",
+        )
+
+    def handle(self, makemigration, name, check, database, verbosity, **options):
+        try:
+            if makemigration:
+                path = write_migration(makemigration, name=name, using=database)
+                if verbosity >= 1:
+                    self.stdout.write(
+                        f"Created migration {path}."
+                        if path
+                        else "All opted-in relations are cascaded by the database."
+                    )
+                return
+
+            report = get_report(using=database)
+        except CascadeError as e:
+            raise CommandError(str(e)) from e
+
+        in_python = 0
+        for field, needed, rule in report:
+            handled = bool(needed) and needed == rule
+            in_python += not handled
+            if verbosity >= 1:
+                location = "database" if handled else "python"
+                self.stdout.write(
+                    f"{field.model._meta.label}.{field.name}: {location} "
+                    f"(needs {needed or 'Python'}, database has {rule or 'no constraint'})"
+                )
+        if verbosity >= 1:
+            self.stdout.write(
+                f"{len(report) - in_python} of {len(report)} relations are "
+                "handled by the database."
+            )
+        if check and in_python:
+            raise CommandError(f"{in_python} relations are still handled in Python.")
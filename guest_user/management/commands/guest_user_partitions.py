@@ -0,0 +1,79 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ...partitions import (
+    PartitionError,
+    create_partitions,
+    detached_partitions,
+    drop_partition,
+    expired_partitions,
+    setup_partitioning,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Manage the daily partitions of the Guest table on PostgreSQL. "
+        "Creates partitions for the next days and optionally drops expired ones."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--setup",
+            action="store_true",
+            help="Convert the Guest table into a partitioned table first.",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=7,
+            help="Number of days to create partitions for.",
+        )
+        parser.add_argument(
+            "--drop-expired",
+            action="store_true",
+            help="Delete the users of expired partitions and drop the partitions.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Number of users deleted per query. "
+            "Defaults to the GUEST_USER_DELETE_BATCH_SIZE setting.",
+        )
+        parser.add_argument(
+            "--database",
+            default="default",
+            help="The database to use.",
+        )
+
+    def handle(
+        self, setup, days, drop_expired, batch_size, database, verbosity, **options
+    ):
+        try:
+            if setup:
+                setup_partitioning(using=database)
+                if verbosity >= 1:
+                    self.stdout.write(
+                        "Converted the Guest table to a partitioned table."
+                    )
+
+            for name in create_partitions(days, using=database):
+                if verbosity >= 1:
+                    self.stdout.write(f"Created partition {name}.")
+
+            if drop_expired:
+                names = detached_partitions(using=database)
+                names += expired_partitions(using=database)
+                for name in names:
+                    guests, counts = drop_partition(
+                        name, batch_size=batch_size, using=database
+                    )
+                    if verbosity >= 1:
+                        self.stdout.write(
+                            f"Dropped partition {name} with {guests} guests."
+                        )
+                    if verbosity >= 2:
+                        for label, count in sorted(counts.items()):
+                            self.stdout.write(f"  {label}: {count}")
+        except PartitionError as e:
+            raise CommandError(str(e)) from e
@@ -0,0 +1,220 @@
+import json
+import logging
+import os
+import random
+import signal
+import threading
+import time
+from argparse import ArgumentTypeError
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, close_old_connections
+from django.utils.timezone import localtime
+
+from ... import settings
+from ...cleanup import delete_expired_guests
+from ...deletion import clear_user_deletion_planners
+
+logger = logging.getLogger(__name__)
+
+
+def parse_window(value: str):
+    """
+    Parse a time window like ``"01:00-05:30"`` into a tuple of two times.
+
+    """
+    try:
+        start, end = value.split("-")
+        return (
+            datetime.strptime(start.strip(), "%H:%M").time(),
+            datetime.strptime(end.strip(), "%H:%M").time(),
+        )
+    except ValueError:
+        raise ArgumentTypeError(f"invalid window '{value}', expected HH:MM-HH:MM")
+
+
+def in_window(moment, window) -> bool:
+    """
+    Check if a time is inside a window. Windows may span midnight.
+
+    """
+    start, end = window
+    if start <= end:
+        return start <= moment < end
+    return moment >= start or moment < end
+
+
+class Command(BaseCommand):
+    help = (
+        "Continuously delete expired guest users in small batches. "
+        "Stops gracefully on SIGTERM or SIGINT."
+    )
+
+    # Seconds to wait after the first failed run, doubled for each further failure.
+    retry_delay = 1.0
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=300,
+            help="Seconds between runs.",
+        )
+        parser.add_argument(
+            "--jitter",
+            type=float,
+            default=0.1,
+            help="Random variation of the interval as a fraction, e.g. 0.1 for ±10%%.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Number of guests deleted per query. "
+            "Defaults to the GUEST_USER_DELETE_BATCH_SIZE setting.",
+        )
+        parser.add_argument(
+            "--max-runtime",
+            type=float,
+            default=None,
+            help="Maximum seconds per run. The current batch is always completed.",
+        )
+        parser.add_argument(
+            "--sleep-between-batches",
+            type=float,
+            default=0,
+            help="Seconds to wait between batches to reduce database load.",
+        )
+        parser.add_argument(
+            "--off-peak",
+            action="append",
+            default=[],
+            type=parse_window,
+            metavar="HH:MM-HH:MM",
+            help="Time window in the current time zone with larger batches. "
+            "Can be given several times.",
+        )
+        parser.add_argument(
+            "--off-peak-batch-size",
+            type=int,
+            default=None,
+            help="Number of guests deleted per query in off-peak windows. "
+            "Defaults to ten times the batch size.",
+        )
+        parser.add_argument(
+            "--heartbeat",
+            default=None,
+            help="File updated after every run with the time and deleted guests.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run once and exit.",
+        )
+
+    def handle(
+        self,
+        interval,
+        jitter,
+        batch_size,
+        max_runtime,
+        sleep_between_batches,
+        off_peak,
+        off_peak_batch_size,
+        heartbeat,
+        once,
+        verbosity,
+        **options,
+    ):
+        batch_size = batch_size or settings.DELETE_BATCH_SIZE
+        off_peak_batch_size = off_peak_batch_size or batch_size * 10
+        self.stop_event = threading.Event()
+        self.total = 0
+        failures = 0
+
+        handlers = {}
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                handlers[signum] = signal.signal(signum, self.stop)
+        try:
+            while not self.stop_event.is_set():
+                off_peak_now = any(
+                    in_window(localtime().time(), window) for window in off_peak
+                )
+                try:
+                    self.run(
+                        batch_size=off_peak_batch_size if off_peak_now else batch_size,
+                        max_runtime=max_runtime,
+                        sleep=sleep_between_batches,
+                        heartbeat=heartbeat,
+                        verbosity=verbosity,
+                    )
+                except DatabaseError as e:
+                    if once:
+                        raise CommandError(f"Deleting expired guests failed: {e}")
+                    failures += 1
+                    delay = min(self.retry_delay * 2 ** (failures - 1), interval)
+                    logger.exception("Deleting expired guests failed.")
+                    if verbosity >= 1:
+                        self.stderr.write(
+                            f"Deleting expired guests failed, retrying in {delay:.0f}s: {e}"
+                        )
+                    # Drop connections that were broken by the error.
+                    close_old_connections()
+                    self.stop_event.wait(delay)
+                    continue
+                failures = 0
+                if once:
+                    break
+                delay = interval * (1 + random.uniform(-jitter, jitter))
+                self.stop_event.wait(max(delay, 0))
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+
+        if verbosity >= 1:
+            self.stdout.write(f"Stopped after deleting {self.total} expired guests.")
+
+    def stop(self, signum, frame):
+        """Finish the current batch and exit."""
+        self.stop_event.set()
+
+    def run(self, batch_size, max_runtime, sleep, heartbeat, verbosity):
+        """Delete the expired guests once."""
+        close_old_connections()
+        clear_user_deletion_planners()
+        deadline = time.monotonic() + max_runtime if max_runtime is not None else None
+        try:
+            stats = delete_expired_guests(
+                batch_size=batch_size,
+                deadline=deadline,
+                sleep=sleep,
+                skip_locked=True,
+                should_stop=self.stop_event.is_set,
+            )
+        finally:
+            close_old_connections()
+        self.total += stats.guests
+
+        if verbosity >= 2 or (verbosity >= 1 and stats.guests):
+            self.stdout.write(
+                f"Deleted {stats.guests} expired guests in {stats.batches} batches "
+                f"of up to {batch_size} ({stats.throughput:.1f}/s)."
+            )
+        if heartbeat:
+            self.write_heartbeat(heartbeat, stats)
+
+    def write_heartbeat(self, path, stats):
+        """Atomically replace the heartbeat file."""
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(
+                {
+                    "timestamp": time.time(),
+                    "deleted": stats.guests,
+                    "total": self.total,
+                },
+                f,
+            )
+        os.replace(temp_path, path)
@@ -0,0 +1,90 @@
+from django.contrib.auth.middleware import AuthenticationMiddleware, get_user
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject, empty
+
+from . import settings
+from .activity import touch_guest
+from .backends import GuestBackend
+from .functions import lazy_guest_status
+from .sessions import SNAPSHOT_SESSION_KEY, get_snapshot_user, store_user_snapshot
+
+SNAPSHOT_STALE_ATTR = "_guest_user_snapshot_stale"
+
+
+class GuestAuthenticationMiddleware(AuthenticationMiddleware):
+    """
+    Authentication middleware that restores guest users from the session.
+
+    Replaces ``django.contrib.auth.middleware.AuthenticationMiddleware``.
+    With :attr:`GUEST_USER_SESSION_SNAPSHOT<guest_user.app_settings.AppSettings.SESSION_SNAPSHOT>`
+    enabled, guest users are rebuilt from a signed snapshot in their session
+    instead of being loaded from the database.
+
+    The snapshot is updated when the guest user is saved during a request and
+    removed when they convert or log in as another user.
+
+    """
+
+    def process_request(self, request):
+        super().process_request(request)
+        if settings.SESSION_SNAPSHOT:
+            request.user = SimpleLazyObject(lambda: self.get_user(request))
+
+    def get_user(self, request):
+        if not hasattr(request, "_cached_user"):
+            user = get_snapshot_user(request)
+            if user is not None:
+                GuestBackend().prime_permission_cache(user)
+                request._cached_user = user
+        return get_user(request)
+
+    def process_response(self, request, response):
+        user = getattr(request, "user", None)
+        if isinstance(user, SimpleLazyObject):
+            user = user._wrapped if user._wrapped is not empty else None
+        if (
+            getattr(user, SNAPSHOT_STALE_ATTR, False)
+            and hasattr(request, "session")
+            and SNAPSHOT_SESSION_KEY in request.session
+        ):
+            store_user_snapshot(request, user)
+            setattr(user, SNAPSHOT_STALE_ATTR, False)
+        return response
+
+
+class GuestStatusMiddleware(MiddlewareMixin):
+    """
+    Add a lazy ``request.is_guest`` attribute to every request.
+
+    The guest status is evaluated at most once per request, when it is first used.
+    Must be placed after the authentication middleware.
+
+    """
+
+    def process_request(self, request):
+        request.is_guest = lazy_guest_status(request)
+
+
+class GuestActivityMiddleware(MiddlewareMixin):
+    """
+    Record when guests were last seen, for sliding expiry.
+
+    The database is updated at most once per guest and
+    :attr:`GUEST_USER_LAST_SEEN_INTERVAL<guest_user.app_settings.AppSettings.LAST_SEEN_INTERVAL>`.
+    Must be placed after the session middleware.
+
+    """
+
+    def process_request(self, request):
+        if settings.SLIDING_EXPIRY and hasattr(request, "session"):
+            touch_guest(request)
+
+
+def mark_snapshot_stale(sender, instance, **kwargs):
+    """
+    Mark a saved user so the middleware updates their session snapshot.
+
+    Connected to the ``post_save`` signal of the user model when snapshots are enabled.
+
+    """
+    setattr(instance, SNAPSHOT_STALE_ATTR, True)
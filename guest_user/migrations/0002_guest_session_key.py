@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("guest_user", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="guest",
+            name="session_key",
+            field=models.CharField(
+                blank=True,
+                default="",
+                editable=False,
+                max_length=40,
+                verbose_name="Session key",
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("guest_user", "0002_guest_session_key"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="guest",
+            name="last_seen",
+            field=models.DateTimeField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                null=True,
+                verbose_name="Last seen",
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("guest_user", "0003_guest_last_seen"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Create the new index before dropping the one it replaces.
+        migrations.AddIndex(
+            model_name="guest",
+            index=models.Index(
+                fields=["created_at", "user"], name="guest_user_created_user_idx"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="guest",
+            name="created_at",
+            field=models.DateTimeField(auto_now_add=True, verbose_name="Created at"),
+        ),
+    ]
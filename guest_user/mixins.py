@@ -3,7 +3,7 @@ from django.contrib.auth import REDIRECT_FIELD_NAME
 from django.shortcuts import redirect
 
 from . import settings
-from .functions import is_guest_user, maybe_create_guest_user, redirect_with_next
+from .functions import is_guest_request, maybe_create_guest_user, redirect_with_next
 
 
 class AllowGuestUserMixin:
@@ -62,7 +62,7 @@ class GuestUserRequiredMixin:
     """
 
     def dispatch(self, request, *args, **kwargs):
-        if is_guest_user(request.user):
+        if is_guest_request(request):
             return super().dispatch(request, *args, **kwargs)
         if request.user.is_anonymous:
             redirect_url = self.anonymous_url or settings.REQUIRED_ANON_URL
@@ -119,7 +119,7 @@ class RegularUserRequiredMixin:
 
     def dispatch(self, request, *args, **kwargs):
         user = request.user
-        if user.is_authenticated and not is_guest_user(user):
+        if user.is_authenticated and not is_guest_request(request):
             return super().dispatch(request, *args, **kwargs)
         if user.is_anonymous:
             redirect_url = self.login_url or django_settings.LOGIN_URL
@@ -1,26 +1,95 @@
+from collections import Counter
 from datetime import timedelta
+from typing import Dict, Iterator, List, Tuple
 
 from django.conf import settings as django_settings
 from django.contrib.auth import get_user_model
-from django.db import IntegrityError, models, transaction
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models import Q
 from django.forms import ModelForm
 from django.utils.module_loading import import_string
 from django.utils.timezone import now
 
 from . import settings
+from .bloom import guest_id_filter
+from .cache import get_status_cache
+from .deletion import get_user_deletion_planner
 from .exceptions import NotGuestError
-from .functions import is_guest_user
+from .functions import GUEST_STATUS_ATTR, is_guest_user
+from .sessions import delete_sessions
 from .signals import converted, guest_created
 
 UserModel = get_user_model()
 
 
+def expired_q() -> Q:
+    """
+    Return the condition matching expired guests.
+
+    With :attr:`GUEST_USER_SLIDING_EXPIRY<guest_user.app_settings.AppSettings.SLIDING_EXPIRY>`
+    guests expire after they were last seen, or after their creation if they
+    were never seen.
+
+    """
+    delete_before = now() - timedelta(seconds=settings.MAX_AGE)
+    if settings.SLIDING_EXPIRY:
+        return Q(last_seen__lt=delete_before) | Q(
+            last_seen__isnull=True, created_at__lt=delete_before
+        )
+    return Q(created_at__lt=delete_before)
+
+
 class GuestQuerySet(models.QuerySet):
     def filter_expired(self):
-        delete_before = now() - timedelta(seconds=settings.MAX_AGE)
-        return self.filter(
-            created_at__lt=delete_before,
-        ).select_related("user")
+        return self.filter(expired_q())
+
+    def expired_page(self, batch_size: int, after=None, skip_locked: bool = False):
+        """
+        Return the next page of expired guests as ``(created_at, user_id)`` tuples.
+
+        Guests are paginated by their creation time and user instead of offsets,
+        so each page costs the same regardless of how many pages were read or
+        deleted before. Only columns of the ``(created_at, user)`` index are
+        selected, which allows index-only scans.
+
+        :param batch_size: Maximum number of rows to return.
+        :param after: The last row of the previous page.
+        :param skip_locked: Lock the returned rows and skip rows locked by
+          other transactions, if supported by the database.
+          Must be called inside a transaction.
+
+        """
+        page = self.filter_expired().order_by("created_at", "user")
+        if after is not None:
+            created_at, user_id = after
+            page = page.filter(
+                Q(created_at__gt=created_at)
+                | Q(created_at=created_at, user__gt=user_id)
+            )
+        features = connections[self.db].features
+        if skip_locked and features.has_select_for_update_skip_locked:
+            of = ("self",) if features.has_select_for_update_of else ()
+            page = page.select_for_update(skip_locked=True, of=of)
+        return list(page.values_list("created_at", "user")[:batch_size])
+
+    def iter_expired_batches(self, batch_size: int = None) -> Iterator[List]:
+        """
+        Yield the user IDs of expired guests in chunks.
+
+        See :meth:`expired_page` for how guests are paginated.
+
+        :param batch_size: Number of user IDs per chunk.
+          Defaults to :attr:`GUEST_USER_DELETE_BATCH_SIZE<guest_user.app_settings.AppSettings.DELETE_BATCH_SIZE>`.
+
+        """
+        batch_size = batch_size or settings.DELETE_BATCH_SIZE
+        after = None
+        while True:
+            rows = self.expired_page(batch_size, after=after)
+            if not rows:
+                return
+            yield [user_id for _created_at, user_id in rows]
+            after = rows[-1]
 
 
 class GuestManager(models.Manager.from_queryset(GuestQuerySet)):
@@ -46,16 +115,25 @@ class GuestManager(models.Manager.from_queryset(GuestQuerySet)):
         if username is None:
             username = self.generate_username(request=request)
 
+        extra_fields = {}
+        if settings.FLAG_FIELD:
+            extra_fields[settings.FLAG_FIELD] = True
+
         user = None
         while user is None:
             try:
                 with transaction.atomic():
-                    user = UserModel.objects.create_user(username)
+                    user = UserModel.objects.create_user(username, **extra_fields)
             except IntegrityError:
                 # retry with a new username
                 username = self.generate_username(request=request)
 
         self.create(user=user)
+        if settings.BLOOM_FILTER:
+            guest_id_filter.add(user.pk)
+        status_cache = get_status_cache()
+        if status_cache is not None:
+            status_cache.set(user.pk, True)
         if request is not None:
             guest_created.send(self, user=user, request=request)
         return user
@@ -75,22 +153,83 @@ class GuestManager(models.Manager.from_queryset(GuestQuerySet)):
         if not is_guest_user(form.instance):
             raise NotGuestError("You cannot convert a non guest user")
 
-        user = form.save()
-
-        # We need to remove the Guest instance assocated with the
-        # newly-converted user
-        self.filter(user=user).delete()
+        with transaction.atomic(using=self.db):
+            # We need to remove the Guest instance assocated with the
+            # newly-converted user. If it is already gone, the guest is
+            # being deleted, e.g. from a detached partition.
+            deleted, _counts = self.filter(user=form.instance).delete()
+            if not deleted:
+                raise NotGuestError("The guest user no longer exists")
+            setattr(form.instance, GUEST_STATUS_ATTR, False)
+
+            if settings.FLAG_FIELD:
+                setattr(form.instance, settings.FLAG_FIELD, False)
+            user = form.save()
+        setattr(user, GUEST_STATUS_ATTR, False)
+        status_cache = get_status_cache()
+        if status_cache is not None:
+            status_cache.set(user.pk, False)
         converted.send(self, user=user)
         return user
 
-    def delete_expired(self):
+    def delete_users(self, user_ids) -> Tuple[int, Dict[str, int]]:
+        """
+        Delete the given users with a set-based query.
+
+        Related objects are deleted by Django's deletion collector or, with
+        :attr:`GUEST_USER_DELETION_PLANNER<guest_user.app_settings.AppSettings.DELETION_PLANNER>`,
+        with bulk queries per relation by the
+        :class:`~guest_user.deletion.DeletionPlanner`.
+        With :attr:`GUEST_USER_PURGE_SESSIONS<guest_user.app_settings.AppSettings.PURGE_SESSIONS>`
+        the recorded sessions of the users are deleted as well.
+
+        :param user_ids: Primary keys of the users to delete.
+        :returns: The number of deleted objects and a dict with the count per model,
+          like :meth:`QuerySet.delete()<django.db.models.query.QuerySet.delete>`.
+
+        """
+        session_keys = []
+        if settings.PURGE_SESSIONS:
+            session_keys = list(
+                self.filter(user__in=user_ids)
+                .exclude(session_key="")
+                .values_list("session_key", flat=True)
+            )
+
+        users = UserModel._base_manager.filter(pk__in=user_ids)
+        if settings.DELETION_PLANNER:
+            result = get_user_deletion_planner(users.db).delete(users)
+        else:
+            result = users.delete()
+        if session_keys:
+            delete_sessions(session_keys)
+        status_cache = get_status_cache()
+        if status_cache is not None:
+            status_cache.invalidate_many(user_ids)
+        return result
+
+    def delete_expired(self, batch_size: int = None) -> Tuple[int, Dict[str, int]]:
         """
         Delete all expired guest users.
 
+        Users are deleted in chunks of ``batch_size``, each in its own transaction.
+
+        :param batch_size: Number of users deleted per chunk.
+          Defaults to :attr:`GUEST_USER_DELETE_BATCH_SIZE<guest_user.app_settings.AppSettings.DELETE_BATCH_SIZE>`.
+        :returns: The total number of deleted objects and a dict with the count per model.
+
         """
-        for guest in self.filter_expired():
-            # Call delete method to trigger signals and cascades
-            guest.user.delete()
+        total = 0
+        counts = Counter()
+        for user_ids in self.iter_expired_batches(batch_size):
+            deleted, per_model = self.delete_users(user_ids)
+            total += deleted
+            counts.update(per_model)
+
+        status_cache = get_status_cache()
+        if status_cache is not None:
+            status_cache.invalidate_all()
+        return total, dict(counts)
 
 
 class Guest(models.Model):
@@ -100,7 +239,8 @@ class Guest(models.Model):
     Users linked to a Guest instance are considered temporary guests and will
     be deleted by cleanup jobs after their expiration.
 
-    The age of a guest user is determined by the ``created_at`` field.
+    The age of a guest user is determined by the ``created_at`` field, or by
+    the ``last_seen`` field with sliding expiry.
 
     This model is swappable with the :attr:`GUEST_USER_MODEL<guest_user.app_settings.AppSettings.MODEL>` setting.
     Custom Guest models should use the GuestManager or a custom manager that
@@ -118,7 +258,22 @@ class Guest(models.Model):
     created_at = models.DateTimeField(
         verbose_name="Created at",
         auto_now_add=True,
+    )
+
+    session_key = models.CharField(
+        verbose_name="Session key",
+        max_length=40,
+        blank=True,
+        default="",
+        editable=False,
+    )
+
+    last_seen = models.DateTimeField(
+        verbose_name="Last seen",
+        null=True,
+        blank=True,
         db_index=True,
+        editable=False,
     )
 
     objects = GuestManager()
@@ -128,6 +283,11 @@ class Guest(models.Model):
         verbose_name_plural = "Guests"
         swappable = "GUEST_USER_MODEL"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["created_at", "user"], name="guest_user_created_user_idx"
+            ),
+        ]
 
     def __str__(self):
         return str(self.user)
@@ -137,4 +297,7 @@ class Guest(models.Model):
         Check if the guest user has expired.
 
         """
-        return self.created_at < now() - timedelta(seconds=settings.MAX_AGE)
+        seen_at = self.created_at
+        if settings.SLIDING_EXPIRY and self.last_seen is not None:
+            seen_at = self.last_seen
+        return seen_at < now() - timedelta(seconds=settings.MAX_AGE)
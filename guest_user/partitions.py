@@ -0,0 +1,355 @@
+"""
+Range partitioning of the Guest table by creation date on PostgreSQL.
+
+The Guest table is converted into a table partitioned by day on ``created_at``.
+Expired guests are then reclaimed by detaching and dropping whole partitions
+instead of deleting rows one by one.
+
+"""
+import re
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from django.contrib.auth import get_user_model
+from django.db import connections, transaction
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import now
+
+from . import settings
+from .functions import get_guest_model
+from .sessions import delete_sessions
+
+LEGACY_SUFFIX = "_legacy"
+DEFAULT_SUFFIX = "_default"
+
+UPPER_BOUND_RE = re.compile(r"TO \('([^']+)'\)")
+
+
+class PartitionError(Exception):
+    """
+    The Guest table can't be partitioned or is not partitioned.
+    """
+
+
+def partition_name(table: str, day: date) -> str:
+    """
+    Return the name of the partition holding the guests created on ``day``.
+
+    """
+    return f"{table}_p{day:%Y%m%d}"
+
+
+def partition_bounds(day: date) -> Tuple[datetime, datetime]:
+    """
+    Return the lower and upper bound of the partition for ``day`` in UTC.
+
+    """
+    start = datetime.combine(day, time.min, tzinfo=timezone.utc)
+    return start, start + timedelta(days=1)
+
+
+def parse_upper_bound(expression: str) -> Optional[datetime]:
+    """
+    Return the upper bound of a partition bound expression, or ``None`` for
+    the default partition.
+
+    """
+    match = UPPER_BOUND_RE.search(expression)
+    if match is None:
+        return None
+    return parse_datetime(match.group(1))
+
+
+def _get_connection(using: str = None):
+    using = using or "default"
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        raise PartitionError("Partitioning is only supported on PostgreSQL.")
+    return connection
+
+
+def _columns():
+    opts = get_guest_model()._meta
+    return {
+        name: opts.get_field(name).column
+        for name in ("user", "created_at", "last_seen", "session_key")
+    }
+
+
+def is_partitioned(using: str = None) -> bool:
+    """
+    Check if the Guest table is partitioned.
+
+    """
+    connection = _get_connection(using)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+            "WHERE partrelid = to_regclass(%s))",
+            [get_guest_model()._meta.db_table],
+        )
+        return cursor.fetchone()[0]
+
+
+def setup_partitioning(using: str = None):
+    """
+    Convert the Guest table into a table partitioned by day on ``created_at``.
+
+    The existing table is kept as a partition holding all guests created before
+    tomorrow and is dropped like any other partition once they all expired.
+    Validating the existing rows requires a full scan while the table is locked.
+
+    Partitioned tables can't enforce a unique constraint on the user column and
+    can't be referenced by foreign keys, so multi-table inheritance of the Guest
+    model is not supported.
+
+    """
+    connection = _get_connection(using)
+    opts = get_guest_model()._meta
+    if opts.parents:
+        raise PartitionError(f"{opts.label} inherits from another model.")
+    if is_partitioned(using):
+        raise PartitionError(f"{opts.db_table} is already partitioned.")
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT conrelid::regclass::text FROM pg_constraint "
+            "WHERE contype = 'f' AND confrelid = to_regclass(%s)",
+            [opts.db_table],
+        )
+        referencing = sorted(table for (table,) in cursor.fetchall())
+    if referencing:
+        raise PartitionError(
+            f"{opts.db_table} is referenced by foreign keys from "
+            f"{', '.join(referencing)} and can't be partitioned."
+        )
+
+    qn = connection.ops.quote_name
+    table = opts.db_table
+    legacy = f"{table}{LEGACY_SUFFIX}"
+    pk = opts.pk.column
+    columns = _columns()
+    user_table = opts.get_field("user").related_model._meta.db_table
+    user_pk = opts.get_field("user").target_field.column
+    _start, first_bound = partition_bounds(now().astimezone(timezone.utc).date())
+
+    statements = [
+        f"LOCK TABLE {qn(table)} IN ACCESS EXCLUSIVE MODE",
+        f"ALTER TABLE {qn(table)} RENAME TO {qn(legacy)}",
+        f"CREATE TABLE {qn(table)} (LIKE {qn(legacy)}) "
+        f"PARTITION BY RANGE ({qn(columns['created_at'])})",
+        f"CREATE SEQUENCE {qn(table + '_' + pk + '_part_seq')} "
+        f"OWNED BY {qn(table)}.{qn(pk)}",
+        f"ALTER TABLE {qn(table)} ALTER COLUMN {qn(pk)} "
+        f"SET DEFAULT nextval('{table}_{pk}_part_seq')",
+        f"SELECT setval('{table}_{pk}_part_seq', "
+        f"COALESCE((SELECT MAX({qn(pk)}) FROM {qn(legacy)}), 0) + 1, false)",
+        f"ALTER TABLE {qn(table)} "
+        f"ADD PRIMARY KEY ({qn(pk)}, {qn(columns['created_at'])})",
+        f"ALTER TABLE {qn(table)} ADD FOREIGN KEY ({qn(columns['user'])}) "
+        f"REFERENCES {qn(user_table)} ({qn(user_pk)}) DEFERRABLE INITIALLY DEFERRED",
+        f"ALTER TABLE {qn(legacy)} ALTER COLUMN {qn(pk)} DROP IDENTITY IF EXISTS",
+        f"ALTER TABLE {qn(legacy)} ALTER COLUMN {qn(pk)} DROP DEFAULT",
+        f"CREATE INDEX {qn(table + '_user_part_idx')} "
+        f"ON {qn(table)} ({qn(columns['user'])})",
+        f"CREATE INDEX {qn(table + '_created_user_part_idx')} "
+        f"ON {qn(table)} ({qn(columns['created_at'])}, {qn(columns['user'])})",
+        f"CREATE INDEX {qn(table + '_last_seen_part_idx')} "
+        f"ON {qn(table)} ({qn(columns['last_seen'])})",
+        f"ALTER TABLE {qn(table)} ATTACH PARTITION {qn(legacy)} "
+        f"FOR VALUES FROM (MINVALUE) TO (%s)",
+        f"CREATE TABLE {qn(table + DEFAULT_SUFFIX)} PARTITION OF {qn(table)} DEFAULT",
+    ]
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement, [first_bound] if "%s" in statement else None)
+
+
+def create_partitions(days: int = 7, start: date = None, using: str = None) -> List:
+    """
+    Create the daily partitions for the next days if they don't exist.
+
+    Partitions must be created before guests are created on that day, otherwise
+    the guests are stored in the default partition.
+
+    :param days: Number of days to create partitions for.
+    :param start: First day, defaults to today.
+    :returns: The names of the created partitions.
+
+    """
+    connection = _get_connection(using)
+    if not is_partitioned(using):
+        raise PartitionError("The Guest table is not partitioned.")
+
+    qn = connection.ops.quote_name
+    table = get_guest_model()._meta.db_table
+    start = start or now().astimezone(timezone.utc).date()
+    covered_until = max(
+        (upper for _name, upper in list_partitions(using) if upper is not None),
+        default=None,
+    )
+
+    created = []
+    with connection.cursor() as cursor:
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            name = partition_name(table, day)
+            if covered_until is not None and partition_bounds(day)[0] < covered_until:
+                continue
+            cursor.execute(
+                f"CREATE TABLE {qn(name)} PARTITION OF {qn(table)} "
+                "FOR VALUES FROM (%s) TO (%s)",
+                list(partition_bounds(day)),
+            )
+            created.append(name)
+    return created
+
+
+def list_partitions(using: str = None) -> List[Tuple[str, Optional[datetime]]]:
+    """
+    Return the name and upper bound of each partition of the Guest table.
+
+    The upper bound of the default partition is ``None``.
+
+    """
+    connection = _get_connection(using)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname, pg_get_expr(child.relpartbound, child.oid) "
+            "FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = to_regclass(%s) "
+            "ORDER BY child.relname",
+            [get_guest_model()._meta.db_table],
+        )
+        return [(name, parse_upper_bound(bound)) for name, bound in cursor.fetchall()]
+
+
+def detached_partitions(using: str = None) -> List[str]:
+    """
+    Return partitions that were detached but not dropped, e.g. after a crash.
+
+    """
+    connection = _get_connection(using)
+    table = get_guest_model()._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT relname FROM pg_class "
+            "WHERE relkind = 'r' AND (relname = %s OR relname ~ %s) "
+            "AND relispartition = false "
+            "ORDER BY relname",
+            [f"{table}{LEGACY_SUFFIX}", f"^{re.escape(table)}_p[0-9]{{8}}$"],
+        )
+        return [name for (name,) in cursor.fetchall()]
+
+
+def expired_partitions(using: str = None) -> List[str]:
+    """
+    Return the partitions that only hold expired guests.
+
+    With sliding expiry, partitions with guests seen recently are skipped.
+
+    """
+    connection = _get_connection(using)
+    qn = connection.ops.quote_name
+    delete_before = now() - timedelta(seconds=settings.MAX_AGE)
+    expired = []
+    for name, upper in list_partitions(using):
+        if upper is None or upper > delete_before:
+            continue
+        if settings.SLIDING_EXPIRY:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT EXISTS (SELECT 1 FROM {qn(name)} "
+                    f"WHERE {qn(_columns()['last_seen'])} >= %s)",
+                    [delete_before],
+                )
+                if cursor.fetchone()[0]:
+                    continue
+        expired.append(name)
+    return expired
+
+
+def _lock_guest_users(user_ids: List, using: str) -> List:
+    """
+    Lock the given users and return those that are still guests.
+
+    """
+    users = get_user_model()._base_manager.using(using).filter(pk__in=user_ids)
+    if settings.FLAG_FIELD:
+        users = users.filter(**{settings.FLAG_FIELD: True})
+    return list(users.select_for_update().values_list("pk", flat=True))
+
+
+def drop_partition(
+    name: str, batch_size: int = None, using: str = None
+) -> Tuple[int, Dict[str, int]]:
+    """
+    Detach a partition, delete the users of its guests and drop it.
+
+    The guest rows are never deleted individually. Once detached, the partition
+    no longer references the users, which are then deleted in batches together
+    with their related objects. Partitions that are already detached are resumed.
+
+    Users are locked before they are deleted. Users that were deleted meanwhile
+    or whose :attr:`GUEST_USER_FLAG_FIELD<guest_user.app_settings.AppSettings.FLAG_FIELD>`
+    was cleared are skipped. Guests can't convert while their partition is
+    detached, because :meth:`GuestManager.convert<guest_user.models.GuestManager.convert>`,
+    the :class:`~guest_user.forms.UserCreationForm` and the allauth integration
+    require their Guest row.
+
+    :returns: The number of deleted users and a dict with the count per model.
+
+    """
+    connection = _get_connection(using)
+    qn = connection.ops.quote_name
+    GuestModel = get_guest_model()
+    table = GuestModel._meta.db_table
+    columns = _columns()
+    batch_size = batch_size or settings.DELETE_BATCH_SIZE
+
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        if name not in detached_partitions(using):
+            cursor.execute(f"ALTER TABLE {qn(table)} DETACH PARTITION {qn(name)}")
+        cursor.execute(
+            "SELECT conname FROM pg_constraint "
+            "WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+            [name],
+        )
+        for (constraint,) in cursor.fetchall():
+            cursor.execute(f"ALTER TABLE {qn(name)} DROP CONSTRAINT {qn(constraint)}")
+
+    guests = 0
+    counts = {}
+    user = qn(columns["user"])
+    select = f"SELECT {user}, {qn(columns['session_key'])} FROM {qn(name)}"
+    last = None
+    while True:
+        with connection.cursor() as cursor:
+            if last is None:
+                cursor.execute(f"{select} ORDER BY {user} LIMIT %s", [batch_size])
+            else:
+                cursor.execute(
+                    f"{select} WHERE {user} > %s ORDER BY {user} LIMIT %s",
+                    [last, batch_size],
+                )
+            rows = cursor.fetchall()
+        if not rows:
+            break
+        with transaction.atomic(using=connection.alias):
+            user_ids = _lock_guest_users(
+                [user_id for user_id, _session_key in rows], connection.alias
+            )
+            _total, per_model = GuestModel.objects.delete_users(user_ids)
+        if settings.PURGE_SESSIONS:
+            delete_sessions(
+                [key for user_id, key in rows if key and user_id in user_ids]
+            )
+        for label, count in per_model.items():
+            counts[label] = counts.get(label, 0) + count
+        guests += len(user_ids)
+        last = rows[-1][0]
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE {qn(name)}")
+    counts[GuestModel._meta.label] = counts.get(GuestModel._meta.label, 0) + guests
+    return guests, counts
@@ -0,0 +1,24 @@
+from . import settings
+from .functions import lazy_guest_status
+from .sessions import record_guest_session, store_guest_status, store_user_snapshot
+
+
+def guest_logged_in(sender, request, user, **kwargs):
+    """
+    Update the session of a user that logged in.
+
+    The guest status and, if enabled, a snapshot of guest users are stored in
+    the session. Both are removed again when logging in with another backend.
+    The guest status of the request is evaluated again for the new user.
+    Session keys of guests are recorded if sessions are purged with the guests.
+
+    """
+    if request is None:
+        return
+    if hasattr(request, "is_guest"):
+        request.is_guest = lazy_guest_status(request)
+    if hasattr(request, "session"):
+        store_guest_status(request, user)
+        store_user_snapshot(request, user)
+        if settings.PURGE_SESSIONS:
+            record_guest_session(request, user)
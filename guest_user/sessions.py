@@ -0,0 +1,211 @@
+from importlib import import_module
+
+from django.conf import settings as django_settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.sessions.backends.cache import SessionStore as CacheStore
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.contrib.sessions.backends.file import SessionStore as FileStore
+from django.core import serializers, signing
+from django.core.cache import caches
+from django.db import router
+from django.utils.crypto import constant_time_compare
+from django.utils.timezone import now
+
+from . import settings
+from .functions import (
+    GUEST_STATUS_ATTR,
+    get_guest_model,
+    is_guest_request,
+    is_guest_user,
+)
+
+GUEST_BACKEND = "guest_user.backends.GuestBackend"
+
+STATUS_SESSION_KEY = "_guest_user_status"
+SNAPSHOT_SESSION_KEY = "_guest_user_snapshot"
+SNAPSHOT_SALT = "guest_user.sessions.snapshot"
+LAST_SEEN_SESSION_KEY = "_guest_user_last_seen"
+
+
+def dump_user_snapshot(user, seen_at) -> str:
+    """
+    Serialize the concrete fields of a user into a compact signed string.
+
+    :param seen_at: The time the expiry of the guest is counted from, their
+      creation or, with sliding expiry, when they were last seen.
+
+    """
+    fields = [field.name for field in user._meta.concrete_fields]
+    data = serializers.serialize("json", [user], fields=fields)
+    payload = {"user": data, "seen": int(seen_at.timestamp())}
+    return signing.dumps(payload, salt=SNAPSHOT_SALT, compress=True)
+
+
+def load_user_snapshot(snapshot, seen=None):
+    """
+    Rebuild a user instance from a snapshot without querying the database.
+
+    Returns ``None`` if the snapshot is invalid or the guest has expired, as they
+    may have been deleted by then.
+
+    :param seen: A later timestamp the guest was seen at, for sliding expiry.
+
+    """
+    try:
+        payload = signing.loads(snapshot, salt=SNAPSHOT_SALT)
+        (deserialized,) = serializers.deserialize("json", payload["user"])
+        seen = max(payload["seen"], seen or 0)
+    except (
+        signing.BadSignature,
+        serializers.base.DeserializationError,
+        KeyError,
+        TypeError,
+        ValueError,
+    ):
+        return None
+    if seen + settings.MAX_AGE <= now().timestamp():
+        return None
+
+    user = deserialized.object
+    user._state.adding = False
+    user._state.db = router.db_for_read(user.__class__, instance=user)
+    setattr(user, GUEST_STATUS_ATTR, True)
+    return user
+
+
+def get_snapshot_user(request):
+    """
+    Return the guest user stored in the session snapshot of this request.
+
+    Returns ``None`` if there is no valid snapshot for the logged in user.
+
+    """
+    session = request.session
+    snapshot = session.get(SNAPSHOT_SESSION_KEY)
+    if snapshot is None or session.get(BACKEND_SESSION_KEY) != GUEST_BACKEND:
+        return None
+
+    seen = session.get(LAST_SEEN_SESSION_KEY) if settings.SLIDING_EXPIRY else None
+    user = load_user_snapshot(snapshot, seen=seen)
+    if user is None or str(user.pk) != str(session.get(SESSION_KEY)):
+        return None
+
+    session_hash = session.get(HASH_SESSION_KEY)
+    if not session_hash or not constant_time_compare(
+        session_hash, user.get_session_auth_hash()
+    ):
+        return None
+    return user
+
+
+def store_user_snapshot(request, user):
+    """
+    Store a snapshot of a guest user in the session, or remove it for other users.
+
+    """
+    guest = None
+    if (
+        settings.SESSION_SNAPSHOT
+        and request.session.get(BACKEND_SESSION_KEY) == GUEST_BACKEND
+        and is_guest_user(user)
+    ):
+        guest = (
+            get_guest_model()
+            .objects.filter(user=user)
+            .values_list("created_at", "last_seen")
+            .first()
+        )
+    if guest is None:
+        request.session.pop(SNAPSHOT_SESSION_KEY, None)
+        return
+
+    created_at, last_seen = guest
+    seen_at = last_seen if settings.SLIDING_EXPIRY and last_seen else created_at
+    request.session[SNAPSHOT_SESSION_KEY] = dump_user_snapshot(user, seen_at)
+
+
+def is_guest_session(request) -> bool:
+    """
+    Check if the current session belongs to a temporary guest.
+
+    The guest status is stored in the session when a user logs in, so this
+    check usually does not load the user or query the database.
+    Sessions without a stored status are checked once and updated.
+
+    """
+    session = request.session
+    user_id = session.get(SESSION_KEY)
+    if not user_id or session.get(BACKEND_SESSION_KEY) != GUEST_BACKEND:
+        # Guests are always authenticated by the GuestBackend.
+        return False
+
+    status = session.get(STATUS_SESSION_KEY)
+    if status is None or status[0] != user_id:
+        is_guest = is_guest_request(request)
+        session[STATUS_SESSION_KEY] = [user_id, is_guest]
+        return is_guest
+    return status[1]
+
+
+def store_guest_status(request, user, is_guest=None):
+    """
+    Store the guest status of a user in the session.
+
+    :param is_guest: The guest status, looked up if not given.
+
+    """
+    session = request.session
+    if session.get(BACKEND_SESSION_KEY) != GUEST_BACKEND:
+        session.pop(STATUS_SESSION_KEY, None)
+        return
+
+    if is_guest is None:
+        is_guest = is_guest_user(user)
+    session[STATUS_SESSION_KEY] = [session[SESSION_KEY], is_guest]
+
+
+def record_guest_session(request, user):
+    """
+    Record the session key of a guest user that logged in.
+
+    Only sessions stored on the server by the database, cache or file engines
+    are recorded. Nothing is recorded for other users or other engines, like
+    signed cookies, whose session key is the whole session.
+
+    """
+    session = request.session
+    if not isinstance(session, (DBStore, CacheStore, FileStore)):
+        return
+    session_key = session.session_key
+    if session_key and is_guest_session(request):
+        get_guest_model().objects.filter(user=user).update(session_key=session_key)
+
+
+def delete_sessions(session_keys):
+    """
+    Delete sessions from the configured session engine.
+
+    Database and cache sessions are deleted with bulk queries, sessions of
+    other engines one by one.
+
+    :param session_keys: The keys of the sessions to delete.
+
+    """
+    SessionStore = import_module(django_settings.SESSION_ENGINE).SessionStore
+    bulk = False
+    if issubclass(SessionStore, DBStore):
+        SessionStore.get_model_class().objects.filter(
+            session_key__in=session_keys
+        ).delete()
+        bulk = True
+    if issubclass(SessionStore, (CacheStore, CachedDBStore)):
+        caches[django_settings.SESSION_CACHE_ALIAS].delete_many(
+            [SessionStore.cache_key_prefix + key for key in session_keys]
+        )
+        bulk = True
+
+    if not bulk:
+        store = SessionStore()
+        for session_key in session_keys:
+            store.delete(session_key)
@@ -9,9 +9,10 @@ To use them, load them in your template:
 
 """
 
-from django.template import Library
+from django.template import Library, Node, TemplateSyntaxError
 
 from ..functions import is_guest_user as is_guest_user_func
+from ..functions import prefetch_guest_status
 
 register = Library()
 
@@ -28,3 +29,45 @@ Usage
   {% endif %}
 
 """
+
+
+class GuestStatusNode(Node):
+    def __init__(self, users, target_var=None):
+        self.users = users
+        self.target_var = target_var
+
+    def render(self, context):
+        guest_ids = prefetch_guest_status(self.users.resolve(context))
+        if self.target_var is not None:
+            context[self.target_var] = guest_ids
+        return ""
+
+
+@register.tag
+def guest_status(parser, token):
+    """
+    Resolve the guest status for a list of users with a single query.
+
+    Use this tag before looping over many users, the ``is_guest_user`` filter
+    will then not issue a query per user for the rest of the template.
+    The tag renders nothing. The set of guest user IDs can be stored in a
+    variable with ``as``.
+
+    Usage
+
+    .. code:: jinja
+
+      {% guest_status authors as guest_ids %}
+      {% for author in authors %}
+        {{ author }}{% if author|is_guest_user %} (guest){% endif %}
+      {% endfor %}
+
+    """
+    bits = token.split_contents()
+    if len(bits) == 2:
+        return GuestStatusNode(parser.compile_filter(bits[1]))
+    if len(bits) == 4 and bits[2] == "as":
+        return GuestStatusNode(parser.compile_filter(bits[1]), bits[3])
+    raise TemplateSyntaxError(
+        f"'{bits[0]}' tag requires a list of users and an optional 'as <variable>'."
+    )
@@ -7,7 +7,7 @@ from django.views.generic import FormView, TemplateView
 
 from . import settings
 from .exceptions import NotGuestError
-from .functions import get_guest_model, is_guest_user
+from .functions import get_guest_model, is_guest_request
 
 
 class ConvertFormView(FormView):
@@ -29,7 +29,7 @@ class ConvertFormView(FormView):
         if request.user.is_anonymous:
             return redirect(self.get_anonymous_redirect())
 
-        if not is_guest_user(request.user):
+        if not is_guest_request(request):
             return redirect(self.get_user_redirect())
 
         return super().dispatch(request, *args, **kwargs)
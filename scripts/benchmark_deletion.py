@@ -0,0 +1,93 @@
+"""
+Benchmark deleting guest users with their related objects.
+
+Compares deleting each user with ``guest.user.delete()``, deleting chunks of
+users with Django's collector and deleting chunks with the DeletionPlanner.
+Runs against a temporary test database of the test project::
+
+    python scripts/benchmark_deletion.py --guests 2000 --batch-size 500
+
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "test_proj.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from allauth.account.models import EmailAddress, EmailConfirmation  # noqa: E402
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.db import connection, transaction  # noqa: E402
+
+from guest_user.deletion import DeletionPlanner  # noqa: E402
+from guest_user.functions import get_guest_model  # noqa: E402
+
+
+def create_guests(count):
+    Guest = get_guest_model()
+    user_ids = []
+    with transaction.atomic():
+        for i in range(count):
+            user = Guest.objects.create_guest_user()
+            address = EmailAddress.objects.create(user=user, email=f"{i}@example.com")
+            EmailConfirmation.objects.create(email_address=address, key=f"key{i}")
+            user_ids.append(user.pk)
+    return user_ids
+
+
+def chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def per_object(user_ids, batch_size):
+    Guest = get_guest_model()
+    for guest in Guest.objects.filter(user__in=user_ids).select_related("user"):
+        guest.user.delete()
+
+
+def collector(user_ids, batch_size):
+    users = get_user_model()._base_manager
+    for chunk in chunks(user_ids, batch_size):
+        with transaction.atomic():
+            users.filter(pk__in=chunk).delete()
+
+
+def planner(user_ids, batch_size):
+    users = get_user_model()._base_manager
+    deletion_planner = DeletionPlanner(get_user_model())
+    for chunk in chunks(user_ids, batch_size):
+        deletion_planner.delete(users.filter(pk__in=chunk))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--guests", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        print(f"Deleting {args.guests} guests with related objects:")
+        for strategy in (per_object, collector, planner):
+            user_ids = create_guests(args.guests)
+            connection.queries_log.clear()
+            started = time.perf_counter()
+            strategy(user_ids, args.batch_size)
+            elapsed = time.perf_counter() - started
+            assert not get_user_model().objects.filter(pk__in=user_ids).exists()
+            print(
+                f"  {strategy.__name__:<12} {elapsed:8.3f}s "
+                f"{args.guests / elapsed:10.0f} guests/s"
+            )
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,9 @@
 import re
+from datetime import timedelta
 
 import pytest
 from django.contrib.auth import get_user_model
+from django.utils.timezone import now
 from guest_user.functions import get_guest_model, is_guest_user
 
 
@@ -40,3 +42,16 @@ class re_match:
 
     def __repr__(self):
         return self._regex.pattern
+
+
+@pytest.fixture
+def create_expired_guests(db):
+    """Return a function creating guests that expired long ago."""
+
+    def create(count):
+        GuestModel = get_guest_model()
+        for _ in range(count):
+            GuestModel.objects.create_guest_user()
+        GuestModel.objects.update(created_at=now() - timedelta(days=25))
+
+    return create
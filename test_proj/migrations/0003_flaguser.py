@@ -0,0 +1,50 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("test_proj", "0002_bookmark_receipt"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FlagUser",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("password", models.CharField(max_length=128, verbose_name="password")),
+                (
+                    "last_login",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="last login"
+                    ),
+                ),
+                (
+                    "is_guest",
+                    models.BooleanField(
+                        default=False,
+                        help_text="Designates whether this user is a temporary guest.",
+                        verbose_name="Guest",
+                    ),
+                ),
+                ("username", models.CharField(max_length=150, unique=True)),
+            ],
+            options={
+                "abstract": False,
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("is_guest", True)),
+                        fields=["is_guest"],
+                        name="test_proj_flaguser_guest",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -1,4 +1,9 @@
+from django.conf import settings as django_settings
+from django.contrib.auth.base_user import AbstractBaseUser
+from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
+from django.contrib.contenttypes.models import ContentType
 from django.db import models
+from guest_user.base_user import GuestUserMixin
 from guest_user.models import Guest
 
 
@@ -6,3 +11,39 @@ class CustomGuest(Guest):
     """Custom guest model."""
 
     extra_data = models.CharField(max_length=255, blank=True, default="dummy")
+
+
+class Bookmark(models.Model):
+    """Model that keeps its rows when the user is deleted."""
+
+    user = models.ForeignKey(
+        django_settings.AUTH_USER_MODEL, null=True, on_delete=models.SET_NULL
+    )
+
+
+class Receipt(models.Model):
+    """Model that prevents deleting its user."""
+
+    user = models.ForeignKey(django_settings.AUTH_USER_MODEL, on_delete=models.PROTECT)
+
+
+class FlagUser(GuestUserMixin, AbstractBaseUser):
+    """User model with the guest flag, not used as AUTH_USER_MODEL."""
+
+    username = models.CharField(max_length=150, unique=True)
+
+    USERNAME_FIELD = "username"
+
+
+class Tag(models.Model):
+    """Model attached to other models with a generic foreign key."""
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    content_object = GenericForeignKey()
+
+
+class Note(models.Model):
+    """Model with a generic relation, not supported by the deletion planner."""
+
+    tags = GenericRelation(Tag)
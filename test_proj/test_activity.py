@@ -0,0 +1,200 @@
+from datetime import timedelta
+
+import pytest
+from django.core.signals import request_finished
+from django.db import OperationalError
+from django.utils.timezone import now
+from guest_user.activity import (
+    LAST_SEEN_SESSION_KEY,
+    LastSeenBuffer,
+    flush_last_seen,
+)
+from guest_user.functions import get_guest_model
+
+
+@pytest.fixture
+def sliding_settings(settings):
+    settings.GUEST_USER_SLIDING_EXPIRY = True
+    settings.MIDDLEWARE = settings.MIDDLEWARE + [
+        "guest_user.middleware.GuestActivityMiddleware"
+    ]
+    return settings
+
+
+@pytest.mark.django_db
+def test_last_seen_updated(client, sliding_settings):
+    client.get("/allow_guest_user/")
+    Guest = get_guest_model()
+    assert Guest.objects.get().last_seen is None
+
+    client.get("/allow_guest_user/")
+    last_seen = Guest.objects.get().last_seen
+    assert last_seen is not None
+    assert LAST_SEEN_SESSION_KEY in client.session
+
+    # Further requests within the interval do not update the guest.
+    client.get("/allow_guest_user/")
+    assert Guest.objects.get().last_seen == last_seen
+
+
+@pytest.mark.django_db
+def test_last_seen_updated_after_interval(client, sliding_settings):
+    client.get("/allow_guest_user/")
+    client.get("/allow_guest_user/")
+    Guest = get_guest_model()
+    Guest.objects.update(last_seen=now() - timedelta(days=1))
+    session = client.session
+    session[LAST_SEEN_SESSION_KEY] -= 300
+    session.save()
+
+    client.get("/allow_guest_user/")
+
+    assert Guest.objects.get().last_seen > now() - timedelta(minutes=1)
+
+
+@pytest.mark.django_db
+def test_last_seen_disabled(client, settings):
+    settings.MIDDLEWARE = settings.MIDDLEWARE + [
+        "guest_user.middleware.GuestActivityMiddleware"
+    ]
+    client.get("/allow_guest_user/")
+    client.get("/allow_guest_user/")
+    assert get_guest_model().objects.get().last_seen is None
+
+
+@pytest.mark.django_db
+def test_sliding_expiry(sliding_settings):
+    Guest = get_guest_model()
+    active = Guest.objects.create_guest_user()
+    idle = Guest.objects.create_guest_user()
+    never_seen = Guest.objects.create_guest_user()
+    Guest.objects.update(created_at=now() - timedelta(days=25))
+    Guest.objects.filter(user=active).update(last_seen=now())
+    Guest.objects.filter(user=idle).update(last_seen=now() - timedelta(days=25))
+
+    expired = set(Guest.objects.filter_expired().values_list("user", flat=True))
+
+    assert expired == {idle.pk, never_seen.pk}
+    assert not Guest.objects.get(user=active).is_expired()
+    assert Guest.objects.get(user=idle).is_expired()
+    assert Guest.objects.get(user=never_seen).is_expired()
+
+
+@pytest.mark.django_db
+def test_sliding_expiry_disabled():
+    Guest = get_guest_model()
+    user = Guest.objects.create_guest_user()
+    Guest.objects.update(created_at=now() - timedelta(days=25), last_seen=now())
+
+    assert Guest.objects.filter_expired().count() == 1
+    assert Guest.objects.get(user=user).is_expired()
+
+
+@pytest.mark.django_db
+def test_last_seen_buffer(settings, django_assert_num_queries):
+    settings.GUEST_USER_LAST_SEEN_BATCH_SIZE = 3
+    Guest = get_guest_model()
+    users = [Guest.objects.create_guest_user() for _ in range(3)]
+    buffer = LastSeenBuffer()
+
+    with django_assert_num_queries(0):
+        buffer.add(users[0].pk)
+        buffer.add(users[1].pk)
+    assert len(buffer) == 2
+
+    with django_assert_num_queries(1):
+        buffer.add(users[2].pk)
+    assert len(buffer) == 0
+    assert not Guest.objects.filter(last_seen__isnull=True).exists()
+
+
+@pytest.mark.django_db
+def test_last_seen_buffer_flush(settings):
+    settings.GUEST_USER_LAST_SEEN_BATCH_SIZE = 10
+    Guest = get_guest_model()
+    user = Guest.objects.create_guest_user()
+    buffer = LastSeenBuffer()
+    buffer.add(user.pk)
+
+    assert buffer.flush() == 1
+    assert buffer.flush() == 0
+    assert Guest.objects.get(user=user).last_seen is not None
+
+
+@pytest.mark.django_db
+def test_last_seen_flushed_when_request_finished(settings, monkeypatch):
+    settings.GUEST_USER_LAST_SEEN_BATCH_SIZE = 10
+    Guest = get_guest_model()
+    user = Guest.objects.create_guest_user()
+    buffer = LastSeenBuffer()
+    monkeypatch.setattr("guest_user.activity.last_seen_buffer", buffer)
+    buffer.add(user.pk)
+
+    flush_last_seen(sender=None)
+    assert len(buffer) == 1
+
+    buffer._since -= 300
+    flush_last_seen(sender=None)
+    assert len(buffer) == 0
+    assert Guest.objects.get(user=user).last_seen is not None
+
+
+@pytest.mark.django_db(transaction=True)
+def test_last_seen_flushed_by_timer(settings):
+    settings.GUEST_USER_LAST_SEEN_BATCH_SIZE = 10
+    settings.GUEST_USER_LAST_SEEN_INTERVAL = 0.05
+    Guest = get_guest_model()
+    user = Guest.objects.create_guest_user()
+    buffer = LastSeenBuffer()
+    buffer.add(user.pk)
+
+    timer = buffer._timer
+    timer.join(timeout=5)
+
+    assert len(buffer) == 0
+    assert Guest.objects.get(user=user).last_seen is not None
+
+
+@pytest.mark.django_db
+def test_last_seen_buffer_no_timer_for_single_updates(settings, monkeypatch):
+    settings.GUEST_USER_LAST_SEEN_BATCH_SIZE = 1
+    user = get_guest_model().objects.create_guest_user()
+    buffer = LastSeenBuffer()
+
+    def fail():
+        raise AssertionError("No timer should be started.")
+
+    monkeypatch.setattr(buffer, "_start_timer", fail)
+    buffer.add(user.pk)
+
+    assert len(buffer) == 0
+
+
+@pytest.mark.django_db
+def test_last_seen_flush_error_closes_connections(settings, monkeypatch, caplog):
+    settings.GUEST_USER_LAST_SEEN_BATCH_SIZE = 10
+    user = get_guest_model().objects.create_guest_user()
+    buffer = LastSeenBuffer()
+    monkeypatch.setattr("guest_user.activity.last_seen_buffer", buffer)
+    buffer.add(user.pk)
+    buffer._since -= 300
+
+    def fail():
+        raise OperationalError("server closed the connection unexpectedly")
+
+    closed = []
+
+    def close_connections(sender, **kwargs):
+        closed.append(sender)
+
+    monkeypatch.setattr(buffer, "flush", fail)
+    request_finished.connect(flush_last_seen)
+    request_finished.connect(close_connections)
+    try:
+        request_finished.send(sender=None)
+    finally:
+        request_finished.disconnect(flush_last_seen)
+        request_finished.disconnect(close_connections)
+
+    assert closed == [None]
+    assert "Writing last seen updates failed." in caplog.text
@@ -0,0 +1,246 @@
+import json
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+from django.contrib.admin import helpers
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils.timezone import now
+from guest_user.admin import EstimatedCountPaginator, GuestAdmin
+from guest_user.models import Guest, expired_q
+
+
+@pytest.fixture
+def guests(db):
+    users = [Guest.objects.create_guest_user() for _ in range(5)]
+    Guest.objects.filter(user__in=users[:3]).update(
+        created_at=now() - timedelta(days=25)
+    )
+    return users
+
+
+@pytest.mark.django_db
+def test_admin_delete_expired_guests(admin_client, guests):
+    url = reverse("admin:guest_user_guest_changelist")
+    response = admin_client.post(
+        url,
+        {
+            "action": "delete_expired_guests",
+            helpers.ACTION_CHECKBOX_NAME: Guest.objects.values_list("pk", flat=True),
+        },
+        follow=True,
+    )
+
+    assert Guest.objects.count() == 2
+    assert get_user_model().objects.filter(pk__in=[u.pk for u in guests]).count() == 2
+    messages = [str(message) for message in response.context["messages"]]
+    assert messages == ["Deleted 3 guests (6 objects in total)."]
+
+
+@pytest.mark.django_db
+def test_admin_delete_selected(admin_client, guests):
+    url = reverse("admin:guest_user_guest_changelist")
+    admin_client.post(
+        url,
+        {
+            "action": "delete_selected",
+            "post": "yes",
+            helpers.ACTION_CHECKBOX_NAME: Guest.objects.values_list("pk", flat=True),
+        },
+    )
+
+    assert Guest.objects.count() == 0
+    assert not get_user_model().objects.filter(pk__in=[u.pk for u in guests]).exists()
+
+
+@pytest.mark.django_db
+def test_admin_delete_model(admin_client, guests):
+    guest = Guest.objects.get(user=guests[0])
+    url = reverse("admin:guest_user_guest_delete", args=[guest.pk])
+    admin_client.post(url, {"post": "yes"})
+
+    assert not Guest.objects.filter(pk=guest.pk).exists()
+    assert not get_user_model().objects.filter(pk=guests[0].pk).exists()
+
+
+@pytest.mark.django_db
+def test_admin_changelist_queries(admin_client, guests, django_assert_max_num_queries):
+    url = reverse("admin:guest_user_guest_changelist")
+    admin_client.get(url)  # Warm up the session and content types.
+
+    with django_assert_max_num_queries(8):
+        response = admin_client.get(url)
+
+    assert response.status_code == 200
+    assert [guest.expired for guest in response.context["cl"].result_list].count(
+        True
+    ) == 3
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("value, count", [("yes", 3), ("no", 2)])
+def test_admin_expired_filter(admin_client, guests, value, count):
+    url = reverse("admin:guest_user_guest_changelist")
+    response = admin_client.get(url, {"expired": value})
+
+    assert response.context["cl"].result_count == count
+
+
+@pytest.mark.django_db
+def test_admin_sort_by_expired(admin_client, guests):
+    url = reverse("admin:guest_user_guest_changelist")
+    response = admin_client.get(url, {"o": "3"})
+
+    expired = [guest.expired for guest in response.context["cl"].result_list]
+    assert expired == [False, False, True, True, True]
+
+
+@pytest.mark.django_db
+def test_admin_keyset_pagination(admin_client, guests, monkeypatch):
+    monkeypatch.setattr(GuestAdmin, "list_per_page", 2)
+    url = reverse("admin:guest_user_guest_changelist")
+    expected = list(Guest.objects.order_by("-created_at", "-pk"))
+
+    pages = []
+    query = ""
+    while query is not None:
+        cl = admin_client.get(url + query).context["cl"]
+        pages.append(list(cl.result_list))
+        query = cl.next_url
+    assert pages == [expected[:2], expected[2:4], expected[4:]]
+    assert cl.first_url == "?"
+
+    response = admin_client.get(url + cl.previous_url)
+    cl = response.context["cl"]
+    assert list(cl.result_list) == expected[2:4]
+    assert cl.next_url is not None
+    assert b"Next" in response.content
+
+
+@pytest.mark.django_db
+def test_admin_keyset_pagination_invalid_cursor(admin_client, guests, monkeypatch):
+    monkeypatch.setattr(GuestAdmin, "list_per_page", 2)
+    url = reverse("admin:guest_user_guest_changelist")
+    cl = admin_client.get(url, {"cursor": "invalid"}).context["cl"]
+
+    assert len(cl.result_list) == 2
+    assert cl.first_url is None
+
+
+@pytest.mark.django_db
+def test_admin_offset_pagination_when_sorted(admin_client, guests, monkeypatch):
+    monkeypatch.setattr(GuestAdmin, "list_per_page", 2)
+    url = reverse("admin:guest_user_guest_changelist")
+    cl = admin_client.get(url, {"o": "3", "p": "2"}).context["cl"]
+
+    assert not cl.keyset
+    assert cl.next_url is None
+    assert len(cl.result_list) == 2
+
+
+@pytest.mark.django_db
+def test_estimated_count_paginator(guests):
+    paginator = EstimatedCountPaginator(Guest.objects.order_by("pk"), 2)
+    assert paginator.count == 5
+
+
+class FakeCursor:
+    def __init__(self, reltuples, plan_rows):
+        self.reltuples = reltuples
+        self.plan_rows = plan_rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execute(self, sql, params):
+        self.explain = sql.startswith("EXPLAIN")
+
+    def fetchone(self):
+        if self.explain:
+            return (json.dumps([{"Plan": {"Plan Rows": self.plan_rows}}]),)
+        return (self.reltuples,)
+
+
+@pytest.fixture
+def fake_postgresql(monkeypatch):
+    def install(reltuples, plan_rows):
+        fake = SimpleNamespace(
+            vendor="postgresql", cursor=lambda: FakeCursor(reltuples, plan_rows)
+        )
+        monkeypatch.setattr("guest_user.admin.connections", {"default": fake})
+
+    return install
+
+
+@pytest.mark.parametrize(
+    "estimate, count, filtered_count",
+    [(250000.0, 250000, 250000), (10.0, 5, 3)],
+)
+@pytest.mark.django_db
+def test_estimated_count_paginator_postgresql(
+    guests, fake_postgresql, estimate, count, filtered_count
+):
+    fake_postgresql(estimate, estimate)
+
+    paginator = EstimatedCountPaginator(Guest.objects.order_by("pk"), 2)
+    assert paginator.count == count
+    # Filtered querysets are estimated from their query plan.
+    filtered = EstimatedCountPaginator(Guest.objects.filter(expired_q()), 2)
+    assert filtered.count == filtered_count
+
+
+@pytest.mark.django_db
+def test_admin_keyset_pagination_skips_offset_page(
+    admin_client, guests, fake_postgresql, monkeypatch
+):
+    fake_postgresql(10.0, 250000)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("The offset page should not be loaded.")
+
+    monkeypatch.setattr(ChangeList, "get_results", fail)
+    monkeypatch.setattr(EstimatedCountPaginator, "page", fail)
+    url = reverse("admin:guest_user_guest_changelist")
+    response = admin_client.get(url, {"expired": "yes"})
+
+    cl = response.context["cl"]
+    assert cl.result_count == 250000
+    assert len(cl.result_list) == 3
+
+
+@pytest.mark.django_db
+def test_admin_delete_confirmation_summary(admin_client, guests, settings):
+    settings.GUEST_USER_ADMIN_DELETE_SUMMARY_THRESHOLD = 2
+    url = reverse("admin:guest_user_guest_changelist")
+    response = admin_client.post(
+        url,
+        {
+            "action": "delete_selected",
+            helpers.ACTION_CHECKBOX_NAME: Guest.objects.values_list("pk", flat=True),
+        },
+    )
+
+    assert response.status_code == 200
+    assert response.context["deletable_objects"] == [["Users: 5", "Guests: 5"]]
+    assert dict(response.context["model_count"]) == {"users": 5, "Guests": 5}
+    assert Guest.objects.count() == 5
+
+
+@pytest.mark.django_db
+def test_admin_delete_confirmation_below_threshold(admin_client, guests):
+    url = reverse("admin:guest_user_guest_changelist")
+    response = admin_client.post(
+        url,
+        {
+            "action": "delete_selected",
+            helpers.ACTION_CHECKBOX_NAME: Guest.objects.values_list("pk", flat=True),
+        },
+    )
+
+    # Each user is followed by the list of its related objects.
+    assert len(response.context["deletable_objects"][0]) == 10
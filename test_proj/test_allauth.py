@@ -3,7 +3,7 @@ from allauth.socialaccount.models import SocialAccount, SocialLogin
 from allauth.socialaccount.signals import social_account_added
 from django.contrib.auth import get_user_model
 from guest_user.contrib.allauth.signals import converted_social_account
-from guest_user.functions import is_guest_user
+from guest_user.functions import get_guest_model, is_guest_user, with_guest_status
 
 from .conftest import re_match
 
@@ -92,3 +92,38 @@ def test_allauth_connect_username_taken(rf, guest_client):
 
     # Allauth will by default append a single numeral to an already taken username
     assert user.username == re_match(r"^%s\d+$" % taken_username)
+
+
+@pytest.mark.django_db
+def test_allauth_connect_deleted_guest(rf, guest_client):
+    """
+    A guest whose Guest row is gone, e.g. in a detached partition,
+    is not converted by connecting a social account.
+
+    """
+    # Loaded with its guest status, like the user of a guest request.
+    user = with_guest_status(get_user_model().objects).get(pk=guest_client.user.pk)
+    username = user.username
+    get_guest_model().objects.filter(user=user).delete()
+    request = rf.get("/accounts/twitter/login/callback/")
+    request.user = user
+    converted = []
+    converted_social_account.connect(converted.append)
+
+    socialaccount = SocialAccount(
+        user=user,
+        provider="twitter",
+        uid="2468",
+        extra_data={"screen_name": "converting_user"},
+    )
+    sociallogin = SocialLogin(user=user, account=socialaccount)
+    try:
+        social_account_added.send(
+            sender=SocialLogin, request=request, sociallogin=sociallogin
+        )
+    finally:
+        converted_social_account.disconnect(converted.append)
+
+    assert converted == []
+    user.refresh_from_db()
+    assert user.username == username
@@ -0,0 +1,114 @@
+import gzip
+import json
+from datetime import timedelta
+
+import pytest
+from allauth.account.models import EmailAddress
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import CommandError
+from django.utils.timezone import now
+from guest_user.archive import GuestArchive
+from guest_user.cleanup import delete_pending_guests
+from guest_user.functions import get_guest_model
+
+from .models import Receipt
+
+
+@pytest.fixture
+def expired_guests(db):
+    Guest = get_guest_model()
+    users = [Guest.objects.create_guest_user() for _ in range(3)]
+    for i, user in enumerate(users):
+        EmailAddress.objects.create(user=user, email=f"guest{i}@example.com")
+    Guest.objects.update(created_at=now() - timedelta(days=25))
+    return users
+
+
+def read_archive(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.mark.django_db
+def test_delete_expired_users_archive(expired_guests, settings, tmp_path):
+    settings.GUEST_USER_ARCHIVE_MODELS = ["account.EmailAddress"]
+    path = tmp_path / "guests.jsonl.gz"
+
+    call_command("delete_expired_users", archive=str(path), batch_size=2, verbosity=0)
+
+    assert not get_user_model().objects.exists()
+    records = read_archive(path)
+    models = [record["model"] for record in records]
+    assert models.count("auth.user") == 3
+    assert models.count("guest_user.guest") == 3
+    assert models.count("account.emailaddress") == 3
+    assert json.loads((tmp_path / "guests.jsonl.gz.checkpoint").read_text()) == {
+        "pending": []
+    }
+
+
+@pytest.mark.django_db
+def test_delete_expired_users_archive_appends(expired_guests, tmp_path):
+    path = tmp_path / "guests.jsonl.gz"
+    call_command("delete_expired_users", archive=str(path), limit=1, verbosity=0)
+    call_command("delete_expired_users", archive=str(path), verbosity=0)
+
+    models = [record["model"] for record in read_archive(path)]
+    assert models.count("auth.user") == 3
+
+
+@pytest.mark.django_db
+def test_archive_resumes_pending_batch(expired_guests, tmp_path):
+    path = tmp_path / "guests.jsonl.gz"
+    archive = GuestArchive(str(path))
+    archive.write_batch([expired_guests[0].pk])
+
+    # The interrupted batch is deleted without archiving it again.
+    call_command("delete_expired_users", archive=str(path), verbosity=0)
+
+    assert not get_user_model().objects.exists()
+    models = [record["model"] for record in read_archive(path)]
+    assert models.count("auth.user") == 3
+
+
+def test_delete_expired_users_archive_with_workers(tmp_path):
+    with pytest.raises(CommandError):
+        call_command(
+            "delete_expired_users", archive=str(tmp_path / "a.jsonl.gz"), workers=2
+        )
+
+
+@pytest.mark.django_db
+def test_archive_pending_converted_guest(expired_guests, tmp_path):
+    path = tmp_path / "guests.jsonl.gz"
+    GuestArchive(str(path)).write_batch([expired_guests[0].pk])
+    # Converted before the interrupted run was resumed.
+    get_guest_model().objects.filter(user=expired_guests[0]).delete()
+
+    call_command("delete_expired_users", archive=str(path), verbosity=0)
+
+    assert list(get_user_model().objects.all()) == [expired_guests[0]]
+
+
+@pytest.mark.django_db
+def test_archive_pending_delete_fails(expired_guests, tmp_path, caplog):
+    archive = GuestArchive(str(tmp_path / "guests.jsonl.gz"))
+    archive.write_batch([expired_guests[0].pk])
+    Receipt.objects.create(user=expired_guests[0])
+
+    delete_pending_guests(get_guest_model().objects.all(), archive.pending(), archive)
+
+    assert "Could not delete the guests pending" in caplog.text
+    # The failed batch no longer blocks later runs.
+    assert archive.pending() == []
+    assert get_user_model().objects.count() == 3
+
+
+def test_archive_model_without_user_relation(tmp_path):
+    with pytest.raises(ImproperlyConfigured, match="test_proj.Note"):
+        GuestArchive(
+            str(tmp_path / "guests.jsonl.gz"),
+            model_labels=["account.EmailAddress", "test_proj.Note"],
+        )
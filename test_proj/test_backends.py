@@ -1,9 +1,10 @@
 import pytest
-from django.contrib.auth import get_user_model
+from django.contrib.auth import BACKEND_SESSION_KEY, get_user_model
+from django.contrib.auth.models import Permission
 from django.test import RequestFactory
 
 from guest_user.backends import GuestBackend
-from guest_user.functions import get_guest_model
+from guest_user.functions import get_guest_model, is_guest_user
 
 TEST_REQUEST_URL = "/some-url/"
 
@@ -44,3 +45,84 @@ def test_backend_authenticates_guest_user_with_request(backend):
 
     backend_guest = backend.authenticate(request=request, username=guest.username)
     assert backend_guest.username == guest.username
+
+
+@pytest.mark.django_db
+def test_backend_get_user_guest_status(backend, django_assert_num_queries):
+    GuestModel = get_guest_model()
+    UserModel = get_user_model()
+    guest = GuestModel.objects.create_guest_user()
+    registered = UserModel.objects.create_user(username="demo", password="hunter2")
+
+    with django_assert_num_queries(2):
+        assert is_guest_user(backend.get_user(guest.pk)) is True
+        assert is_guest_user(backend.get_user(registered.pk)) is False
+
+
+@pytest.mark.django_db
+def test_backend_get_user_does_not_exist(backend):
+    assert backend.get_user(1234) is None
+
+
+@pytest.mark.django_db
+def test_guest_request_auth_queries(guest_client, django_assert_num_queries):
+    """A guest request loads the session and the user with their guest status."""
+    session = guest_client.session
+    session[BACKEND_SESSION_KEY] = "guest_user.backends.GuestBackend"
+    session.save()
+
+    with django_assert_num_queries(2):
+        response = guest_client.get("/guest_user_required/")
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_backend_authenticate_single_query(backend, django_assert_num_queries):
+    GuestModel = get_guest_model()
+    UserModel = get_user_model()
+    guest = GuestModel.objects.create_guest_user()
+    registered = UserModel.objects.create_user(username="demo", password="hunter2")
+
+    with django_assert_num_queries(1):
+        user = backend.authenticate(request=None, username=guest.username)
+        assert is_guest_user(user) is True
+
+    with django_assert_num_queries(1):
+        assert backend.authenticate(request=None, username=registered.username) is None
+
+
+@pytest.mark.django_db
+def test_backend_guest_permissions(backend, django_assert_num_queries):
+    GuestModel = get_guest_model()
+    guest = GuestModel.objects.create_guest_user()
+    guest.user_permissions.add(Permission.objects.get(codename="add_user"))
+
+    user = backend.get_user(guest.pk)
+    with django_assert_num_queries(0):
+        assert user.get_all_permissions() == set()
+        assert user.has_perm("auth.add_user") is False
+        assert user.has_module_perms("auth") is False
+        assert backend.get_group_permissions(user) == set()
+
+
+@pytest.mark.django_db
+def test_backend_guest_permissions_enabled(backend, settings):
+    settings.GUEST_USER_CHECK_PERMISSIONS = True
+    GuestModel = get_guest_model()
+    guest = GuestModel.objects.create_guest_user()
+    guest.user_permissions.add(Permission.objects.get(codename="add_user"))
+
+    user = backend.get_user(guest.pk)
+    assert user.has_perm("auth.add_user") is True
+
+
+@pytest.mark.django_db
+def test_backend_registered_permissions(backend, django_assert_num_queries):
+    UserModel = get_user_model()
+    user = UserModel.objects.create_user(username="demo", password="hunter2")
+    user.user_permissions.add(Permission.objects.get(codename="add_user"))
+    user = UserModel.objects.get(pk=user.pk)
+
+    # The guest status is unknown, so it is not looked up.
+    with django_assert_num_queries(2):
+        assert backend.get_all_permissions(user) == {"auth.add_user"}
@@ -0,0 +1,136 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError
+from guest_user.bloom import BloomFilter, GuestIdFilter
+from guest_user.functions import get_guest_model, is_guest_user
+
+
+def test_bloom_filter():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(0, 2000, 2):
+        bloom.add(i)
+
+    assert all(i in bloom for i in range(0, 2000, 2))
+    false_positives = sum(i in bloom for i in range(1, 20001, 2))
+    assert false_positives < 300
+    assert bloom.count == 1000
+    assert bloom.memory_bytes < 1300
+    assert 0.005 < bloom.false_positive_rate < 0.02
+
+
+@pytest.fixture
+def guest_id_filter(settings, monkeypatch):
+    settings.GUEST_USER_BLOOM_FILTER = True
+    guest_id_filter = GuestIdFilter()
+    monkeypatch.setattr("guest_user.functions.guest_id_filter", guest_id_filter)
+    monkeypatch.setattr("guest_user.models.guest_id_filter", guest_id_filter)
+    return guest_id_filter
+
+
+@pytest.mark.django_db
+def test_guest_id_filter_skips_query(guest_id_filter, django_assert_num_queries):
+    UserModel = get_user_model()
+    GuestModel = get_guest_model()
+    user = UserModel.objects.create_user("registered")
+    guest = GuestModel.objects.create_guest_user()
+
+    guest_id_filter.rebuild()
+    # Only users that existed before the previous refresh are trusted.
+    assert not guest_id_filter.is_not_guest(user.pk)
+    guest_id_filter.refresh()
+
+    with django_assert_num_queries(0):
+        assert is_guest_user(user) is False
+    with django_assert_num_queries(1):
+        assert is_guest_user(guest) is True
+
+
+@pytest.mark.django_db
+def test_guest_id_filter_new_users(guest_id_filter):
+    UserModel = get_user_model()
+    GuestModel = get_guest_model()
+    UserModel.objects.create_user("registered")
+    guest_id_filter.rebuild()
+    guest_id_filter.refresh()
+
+    # Created after the last refresh, must be checked in the database.
+    guest = GuestModel.objects.create_guest_user()
+    user = UserModel.objects.create_user("new_registered")
+    assert not guest_id_filter.is_not_guest(guest.pk)
+    assert not guest_id_filter.is_not_guest(user.pk)
+    assert is_guest_user(guest) is True
+
+    guest_id_filter.refresh()
+    guest_id_filter.refresh()
+    assert not guest_id_filter.is_not_guest(guest.pk)
+    assert guest_id_filter.is_not_guest(user.pk)
+
+
+@pytest.mark.django_db
+def test_guest_id_filter_stats(guest_id_filter):
+    assert guest_id_filter.stats()["items"] == 0
+
+    GuestModel = get_guest_model()
+    for _ in range(3):
+        GuestModel.objects.create_guest_user()
+    guest_id_filter.rebuild()
+
+    stats = guest_id_filter.stats()
+    assert stats["items"] == 3
+    assert stats["memory_bytes"] > 0
+    assert stats["false_positive_rate"] < 0.01
+
+
+@pytest.mark.django_db(transaction=True)
+def test_guest_id_filter_builds_in_background(
+    guest_id_filter, django_assert_num_queries
+):
+    user = get_user_model().objects.create_user("registered")
+    guest_id_filter.refresh_lock.acquire()
+    try:
+        # Another thread builds the filter, fall through to the database.
+        with django_assert_num_queries(0):
+            assert not guest_id_filter.is_not_guest(user.pk)
+        assert guest_id_filter.thread is None
+    finally:
+        guest_id_filter.refresh_lock.release()
+
+    with django_assert_num_queries(0):
+        assert not guest_id_filter.is_not_guest(user.pk)
+    guest_id_filter.thread.join()
+    assert guest_id_filter.bloom is not None
+
+
+@pytest.mark.django_db
+def test_guest_id_filter_rebuild_keeps_previous(
+    guest_id_filter, settings, django_assert_num_queries
+):
+    user = get_user_model().objects.create_user("registered")
+    guest_id_filter.rebuild()
+    guest_id_filter.refresh()
+    settings.GUEST_USER_BLOOM_FILTER_REBUILD_INTERVAL = 0
+
+    guest_id_filter.refresh_lock.acquire()
+    try:
+        # A rebuild is running, the previous filter still answers.
+        with django_assert_num_queries(0):
+            assert guest_id_filter.is_not_guest(user.pk)
+    finally:
+        guest_id_filter.refresh_lock.release()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_guest_id_filter_background_error(guest_id_filter, monkeypatch, caplog):
+    def fail():
+        raise DatabaseError("connection lost")
+
+    monkeypatch.setattr(guest_id_filter, "rebuild", fail)
+    guest_id_filter.maybe_refresh()
+    guest_id_filter.thread.join()
+
+    assert "Refreshing the guest ID filter failed." in caplog.text
+    assert not guest_id_filter.refresh_lock.locked()
+    # Not retried before the refresh interval has passed.
+    thread = guest_id_filter.thread
+    guest_id_filter.maybe_refresh()
+    assert guest_id_filter.thread is thread
@@ -0,0 +1,119 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete
+from django.utils.timezone import now
+from guest_user.cache import get_status_cache, invalidate_guest_status
+from guest_user.forms import UserCreationForm
+from guest_user.functions import get_guest_model, is_guest_user
+
+
+@pytest.fixture(params=["locmem", "filebased"])
+def status_cache(request, settings, tmp_path):
+    if request.param == "locmem":
+        backend = {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "guest-status",
+        }
+    else:
+        backend = {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": str(tmp_path),
+        }
+    settings.CACHES = {**settings.CACHES, "guest_status": backend}
+    settings.GUEST_USER_CACHE = "guest_status"
+
+    status_cache = get_status_cache()
+    status_cache.cache.clear()
+    status_cache.hits = status_cache.misses = 0
+    return status_cache
+
+
+def test_cache_disabled():
+    assert get_status_cache() is None
+
+
+@pytest.mark.django_db
+def test_cache_stores_status(status_cache, django_assert_num_queries):
+    UserModel = get_user_model()
+    user = UserModel.objects.create_user("registered")
+
+    with django_assert_num_queries(1):
+        assert is_guest_user(user) is False
+    assert status_cache.stats() == {"hits": 0, "misses": 1}
+
+    user = UserModel.objects.get(pk=user.pk)
+    with django_assert_num_queries(0):
+        assert is_guest_user(user) is False
+    assert status_cache.stats() == {"hits": 1, "misses": 1}
+
+
+@pytest.mark.django_db
+def test_cache_create_guest_user(status_cache, django_assert_num_queries):
+    GuestModel = get_guest_model()
+    user = GuestModel.objects.create_guest_user()
+    user = get_user_model().objects.get(pk=user.pk)
+
+    with django_assert_num_queries(0):
+        assert is_guest_user(user) is True
+
+
+@pytest.mark.django_db
+def test_cache_convert(status_cache):
+    GuestModel = get_guest_model()
+    user = GuestModel.objects.create_guest_user()
+    form = UserCreationForm(
+        instance=user,
+        data={
+            "username": "converted",
+            "password1": "7mashedPotatoes",
+            "password2": "7mashedPotatoes",
+        },
+    )
+    assert form.is_valid(), form.errors
+    GuestModel.objects.convert(form)
+
+    assert status_cache.get(user.pk) is False
+
+
+@pytest.mark.django_db
+def test_cache_lookup_does_not_overwrite_conversion(status_cache, monkeypatch):
+    user = get_guest_model().objects.create_guest_user()
+    user = get_user_model().objects.get(pk=user.pk)
+    # The lookup missed the cache and read the Guest row before the
+    # conversion committed and stored its status.
+    get = status_cache.get
+    monkeypatch.setattr(status_cache, "get", lambda user_pk: None)
+    status_cache.set(user.pk, False)
+
+    assert is_guest_user(user) is True
+    monkeypatch.setattr(status_cache, "get", get)
+    assert status_cache.get(user.pk) is False
+
+
+@pytest.mark.django_db
+def test_cache_delete_expired(status_cache):
+    GuestModel = get_guest_model()
+    user = GuestModel.objects.create_guest_user()
+    GuestModel.objects.update(created_at=now() - timedelta(days=30))
+    generation = status_cache.get_generation()
+
+    GuestModel.objects.delete_expired()
+
+    assert status_cache.get_generation() == generation + 1
+    assert status_cache.get(user.pk) is None
+
+
+@pytest.mark.django_db
+def test_cache_guest_post_delete(status_cache):
+    GuestModel = get_guest_model()
+    user = GuestModel.objects.create_guest_user()
+    post_delete.connect(invalidate_guest_status, sender=GuestModel)
+    try:
+        GuestModel.objects.filter(user=user).delete()
+    finally:
+        post_delete.disconnect(invalidate_guest_status, sender=GuestModel)
+
+    assert status_cache.get(user.pk) is None
+    assert is_guest_user(user) is False
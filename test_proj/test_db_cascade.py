@@ -0,0 +1,195 @@
+from types import SimpleNamespace
+
+import pytest
+from allauth.account.models import EmailAddress, EmailConfirmation
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.core.management.sql import emit_post_migrate_signal
+from guest_user.db_cascade import (
+    get_constraint_sql,
+    get_database_rule,
+    get_drop_constraint_sql,
+    get_operations,
+    get_relations,
+    get_report,
+)
+from guest_user.deletion import (
+    DeletionPlanner,
+    clear_user_deletion_planners,
+    get_user_deletion_planner,
+)
+from guest_user.functions import get_guest_model
+from guest_user.models import Guest
+
+from .models import Bookmark
+
+
+@pytest.fixture(autouse=True)
+def clear_planners():
+    clear_user_deletion_planners()
+    yield
+    clear_user_deletion_planners()
+
+
+def test_relations():
+    relations = {field.model._meta.label: needed for field, needed in get_relations()}
+    assert relations["account.EmailAddress"] == "CASCADE"
+    assert relations["account.EmailConfirmation"] == "CASCADE"
+    assert relations["guest_user.Guest"] == "CASCADE"
+    assert relations["test_proj.Bookmark"] == "SET NULL"
+
+
+def test_deletion_planner_database_fields():
+    address_field = EmailAddress._meta.get_field("user")
+    confirmation_field = EmailConfirmation._meta.get_field("email_address")
+    bookmark_field = Bookmark._meta.get_field("user")
+
+    def labels(planner):
+        return {child.model._meta.label for child in planner.root.children} | {
+            update.model._meta.label for update, _ in planner.root.updates
+        }
+
+    full = labels(DeletionPlanner(get_user_model()))
+    # The address can't be left to the database while its confirmations are not.
+    partial = DeletionPlanner(get_user_model(), [address_field, bookmark_field])
+    pruned = DeletionPlanner(
+        get_user_model(), [address_field, confirmation_field, bookmark_field]
+    )
+
+    assert {"account.EmailAddress", "test_proj.Bookmark"} <= full
+    assert labels(partial) == full - {"test_proj.Bookmark"}
+    assert labels(pruned) == full - {"account.EmailAddress", "test_proj.Bookmark"}
+
+
+@pytest.mark.django_db
+def test_report_sqlite():
+    report = get_report()
+
+    assert report
+    assert all(rule != needed for _field, needed, rule in report)
+
+
+@pytest.mark.django_db
+def test_command_report():
+    with pytest.raises(CommandError, match="still handled in Python"):
+        call_command("guest_user_db_cascade", check=True, verbosity=0)
+
+
+@pytest.mark.django_db
+def test_command_makemigration_unsupported():
+    with pytest.raises(CommandError, match="not supported"):
+        call_command("guest_user_db_cascade", makemigration="test_proj", verbosity=0)
+
+
+@pytest.mark.django_db
+def test_db_cascade_without_constraints(settings):
+    settings.GUEST_USER_DELETION_PLANNER = True
+    settings.GUEST_USER_DB_CASCADE = True
+    user = get_guest_model().objects.create_guest_user()
+    EmailAddress.objects.create(user=user, email="guest@example.com")
+
+    assert get_user_deletion_planner().database_fields == set()
+    get_guest_model().objects.delete_users([user.pk])
+
+    assert not EmailAddress.objects.filter(user_id=user.pk).exists()
+    assert not Guest.objects.filter(user_id=user.pk).exists()
+
+
+@pytest.mark.django_db
+def test_planner_inspected_again(settings, monkeypatch, create_expired_guests):
+    settings.GUEST_USER_DELETION_PLANNER = True
+    settings.GUEST_USER_DB_CASCADE = True
+    inspected = []
+
+    def get_database_fields(using):
+        inspected.append(using)
+        return set()
+
+    monkeypatch.setattr(
+        "guest_user.db_cascade.get_database_fields", get_database_fields
+    )
+
+    assert get_user_deletion_planner() is get_user_deletion_planner()
+    assert len(inspected) == 1
+
+    # A migration may have changed the constraints.
+    emit_post_migrate_signal(0, False, "default")
+    get_user_deletion_planner()
+    assert len(inspected) == 2
+
+    for _ in range(2):
+        create_expired_guests(1)
+        call_command("delete_expired_users", verbosity=0)
+    assert len(inspected) == 4
+
+
+def test_database_rule_unsupported_vendor():
+    fake = SimpleNamespace(vendor="oracle")
+
+    assert get_database_rule(fake, EmailAddress._meta.get_field("user")) == (
+        None,
+        None,
+    )
+
+
+@pytest.mark.skipif(
+    connection.vendor != "postgresql", reason="Requires ALTER TABLE constraints."
+)
+@pytest.mark.django_db
+def test_operations_postgresql(settings):
+    settings.GUEST_USER_DELETION_PLANNER = True
+    settings.GUEST_USER_DB_CASCADE = True
+    settings.GUEST_USER_DB_CASCADE_MODELS = [
+        "account.EmailAddress",
+        "account.EmailConfirmation",
+        "test_proj.Bookmark",
+    ]
+
+    operations = get_operations()
+    assert operations
+    with connection.schema_editor() as schema_editor:
+        for operation in operations:
+            operation.database_forwards("test_proj", schema_editor, None, None)
+
+    opted_in = {"guest_user.Guest"} | set(settings.GUEST_USER_DB_CASCADE_MODELS)
+    for field, needed, rule in get_report():
+        if field.model._meta.label in opted_in:
+            assert rule == needed
+    assert get_operations() == []
+
+    planner = get_user_deletion_planner()
+    assert planner.database_fields
+    user = get_guest_model().objects.create_guest_user()
+    address = EmailAddress.objects.create(user=user, email="guest@example.com")
+    EmailConfirmation.objects.create(email_address=address, key="key")
+    bookmark = Bookmark.objects.create(user=user)
+
+    get_guest_model().objects.delete_users([user.pk])
+
+    assert not EmailConfirmation.objects.filter(email_address=address).exists()
+    assert not EmailAddress.objects.filter(user_id=user.pk).exists()
+    assert not Guest.objects.filter(user_id=user.pk).exists()
+    bookmark.refresh_from_db()
+    assert bookmark.user_id is None
+
+
+def test_constraint_sql():
+    fake = SimpleNamespace(
+        vendor="postgresql",
+        ops=connection.ops,
+        features=SimpleNamespace(can_defer_constraint_checks=True),
+    )
+    field = EmailAddress._meta.get_field("user")
+
+    assert get_constraint_sql(fake, field, "fk", "CASCADE") == (
+        'ALTER TABLE "account_emailaddress" ADD CONSTRAINT "fk" '
+        'FOREIGN KEY ("user_id") REFERENCES "auth_user" ("id") '
+        "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED"
+    )
+    assert get_drop_constraint_sql(fake, field, "fk") == (
+        'ALTER TABLE "account_emailaddress" DROP CONSTRAINT "fk"'
+    )
+    fake.vendor = "mysql"
+    assert "DROP FOREIGN KEY" in get_drop_constraint_sql(fake, field, "fk")
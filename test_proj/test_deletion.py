@@ -0,0 +1,179 @@
+import pytest
+from allauth.account.models import EmailAddress, EmailConfirmation
+from django.contrib.auth import get_user_model
+from django.db.models import ProtectedError
+from django.db.models.signals import post_delete, pre_delete
+from guest_user.deletion import DeletionPlanner, count_deleted_objects
+from guest_user.functions import get_guest_model
+from guest_user.models import Guest
+
+from .models import Bookmark, Note, Receipt, Tag
+
+
+@pytest.mark.django_db
+def test_count_deleted_objects_matches_delete():
+    Guest = get_guest_model()
+    users = [Guest.objects.create_guest_user() for _ in range(3)]
+    for i, user in enumerate(users[:2]):
+        EmailAddress.objects.create(user=user, email=f"guest{i}@example.com")
+    queryset = get_user_model()._base_manager.filter(pk__in=[u.pk for u in users])
+
+    counts, protected = count_deleted_objects(queryset)
+    _total, deleted = queryset.delete()
+
+    assert {model._meta.label: count for model, count in counts.items()} == deleted
+    assert protected == {}
+
+
+@pytest.mark.django_db
+def test_count_deleted_objects_empty(django_assert_num_queries):
+    queryset = get_user_model()._base_manager.none()
+
+    with django_assert_num_queries(0):
+        counts, protected = count_deleted_objects(queryset)
+
+    assert counts == {}
+    assert protected == {}
+
+
+def create_guests_with_related_objects(count):
+    Guest = get_guest_model()
+    users = [Guest.objects.create_guest_user() for _ in range(count)]
+    for i, user in enumerate(users):
+        address = EmailAddress.objects.create(user=user, email=f"guest{i}@example.com")
+        EmailConfirmation.objects.create(email_address=address, key=f"key{i}")
+        Bookmark.objects.create(user=user)
+    return users
+
+
+def deletion_result(delete, user_ids):
+    """Delete the users and return the deletion result with the remaining rows."""
+    queryset = get_user_model()._base_manager.filter(pk__in=user_ids)
+    result = delete(queryset)
+    remaining = {
+        model._meta.label: model._base_manager.count()
+        for model in (get_user_model(), Guest, EmailAddress, EmailConfirmation)
+    }
+    return result, remaining, Bookmark.objects.filter(user__isnull=True).count()
+
+
+@pytest.mark.django_db
+def test_deletion_planner_matches_collector():
+    planner = DeletionPlanner(get_user_model())
+    assert planner.supported
+
+    users = create_guests_with_related_objects(4)
+    planned = deletion_result(planner.delete, [u.pk for u in users[:2]])
+    collected = deletion_result(lambda qs: qs.delete(), [u.pk for u in users[2:]])
+
+    assert planned[0] == collected[0]
+    assert planned[0][1]["account.EmailConfirmation"] == 2
+    assert collected[1] == {label: 0 for label in planned[1]}
+    assert (planned[2], collected[2]) == (2, 4)
+
+
+@pytest.mark.django_db
+def test_deletion_planner_sends_signals():
+    planner = DeletionPlanner(get_user_model())
+    users = create_guests_with_related_objects(2)
+    deleted = []
+
+    def receiver(sender, instance, **kwargs):
+        deleted.append((sender, instance.email))
+
+    post_delete.connect(receiver, sender=EmailAddress)
+    try:
+        planner.delete(get_user_model()._base_manager.filter(pk__in=[users[0].pk]))
+    finally:
+        post_delete.disconnect(receiver, sender=EmailAddress)
+
+    assert deleted == [(EmailAddress, "guest0@example.com")]
+
+
+@pytest.mark.django_db
+def test_deletion_planner_pre_delete_sees_related_rows():
+    planner = DeletionPlanner(get_user_model())
+    users = create_guests_with_related_objects(2)
+    seen = []
+
+    def receiver(sender, instance, **kwargs):
+        seen.append(
+            (
+                EmailAddress.objects.filter(user=instance).count(),
+                EmailConfirmation.objects.filter(email_address__user=instance).count(),
+                Bookmark.objects.filter(user=instance).count(),
+            )
+        )
+
+    pre_delete.connect(receiver, sender=get_user_model())
+    try:
+        planner.delete(get_user_model()._base_manager.filter(pk=users[0].pk))
+        get_user_model()._base_manager.filter(pk=users[1].pk).delete()
+    finally:
+        pre_delete.disconnect(receiver, sender=get_user_model())
+
+    # The planner is checked first, the collector second.
+    assert seen == [(1, 1, 1), (1, 1, 1)]
+
+
+@pytest.mark.django_db
+def test_deletion_planner_protected():
+    planner = DeletionPlanner(get_user_model())
+    user = get_guest_model().objects.create_guest_user()
+    Receipt.objects.create(user=user)
+
+    with pytest.raises(ProtectedError):
+        planner.delete(get_user_model()._base_manager.filter(pk=user.pk))
+    assert get_user_model().objects.filter(pk=user.pk).exists()
+
+
+@pytest.mark.django_db
+def test_deletion_planner_fallback():
+    planner = DeletionPlanner(Note)
+    assert not planner.supported
+    assert planner.reason == "test_proj.Note has generic relations."
+
+    notes = [Note.objects.create() for _ in range(2)]
+    for note in notes:
+        Tag.objects.create(content_object=note)
+    Tag.objects.create(content_object=Bookmark.objects.create())
+
+    total, counts = planner.delete(Note.objects.filter(pk=notes[0].pk))
+
+    # The collector also deletes the tags of the generic relation.
+    assert counts == {"test_proj.Note": 1, "test_proj.Tag": 1}
+    assert Tag.objects.count() == 2
+    assert not Tag.objects.filter(object_id=notes[0].pk, content_type__model="note")
+
+
+@pytest.mark.django_db
+def test_delete_users_uses_collector_by_default(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("The deletion planner should not be used.")
+
+    monkeypatch.setattr(DeletionPlanner, "delete", fail)
+    users = create_guests_with_related_objects(2)
+
+    total, counts = get_guest_model().objects.delete_users([u.pk for u in users])
+
+    assert counts["account.EmailConfirmation"] == 2
+    assert not get_user_model().objects.filter(pk__in=[u.pk for u in users])
+
+
+@pytest.mark.django_db
+def test_delete_users_with_planner(settings, monkeypatch):
+    settings.GUEST_USER_DELETION_PLANNER = True
+    calls = []
+    delete = DeletionPlanner.delete
+
+    def spy(self, queryset):
+        calls.append(queryset.model)
+        return delete(self, queryset)
+
+    monkeypatch.setattr(DeletionPlanner, "delete", spy)
+    users = create_guests_with_related_objects(2)
+
+    total, counts = get_guest_model().objects.delete_users([u.pk for u in users])
+
+    assert calls == [get_user_model()]
+    assert counts["account.EmailConfirmation"] == 2
@@ -0,0 +1,134 @@
+"""
+Tests for the GUEST_USER_FLAG_FIELD setting.
+
+The test project uses the default user model, so the ``is_staff`` field stands
+in for the ``is_guest`` field provided by the GuestUserMixin. The mixin itself is
+tested with the ``FlagUser`` model.
+"""
+
+from io import StringIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from guest_user.backends import GuestBackend
+from guest_user.base_user import GuestUserMixin
+from guest_user.forms import UserCreationForm
+from guest_user.functions import get_guest_model, is_guest_user, with_guest_status
+
+from .models import FlagUser
+
+
+@pytest.fixture
+def flag_field(settings):
+    settings.GUEST_USER_FLAG_FIELD = "is_staff"
+    return "is_staff"
+
+
+def test_mixin_field():
+    field = GuestUserMixin._meta.get_field("is_guest")
+    assert field.default is False
+    (index,) = GuestUserMixin._meta.indexes
+    assert index.fields == ["is_guest"]
+
+
+@pytest.mark.django_db
+def test_mixin_model(settings, django_assert_num_queries):
+    settings.GUEST_USER_FLAG_FIELD = "is_guest"
+    FlagUser.objects.create(username="guest", is_guest=True)
+    FlagUser.objects.create(username="registered")
+
+    with django_assert_num_queries(1):
+        users = {user.username: user for user in with_guest_status(FlagUser.objects)}
+        assert is_guest_user(users["guest"]) is True
+        assert is_guest_user(users["registered"]) is False
+    with django_assert_num_queries(0):
+        assert is_guest_user(FlagUser(username="new", is_guest=True)) is True
+
+
+@pytest.mark.skipif(connection.vendor != "sqlite", reason="SQLite query plan")
+@pytest.mark.django_db
+def test_mixin_partial_index():
+    sql, params = FlagUser.objects.filter(is_guest=True).query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        plan = " ".join(str(row[-1]) for row in cursor.fetchall())
+
+    assert "test_proj_flaguser_guest" in plan
+
+
+@pytest.mark.django_db
+def test_flag_field_create_guest_user(flag_field, django_assert_num_queries):
+    GuestModel = get_guest_model()
+    user = GuestModel.objects.create_guest_user()
+    assert user.is_staff is True
+
+    user = get_user_model().objects.get(pk=user.pk)
+    with django_assert_num_queries(0):
+        assert is_guest_user(user) is True
+
+
+@pytest.mark.django_db
+def test_flag_field_registered_user(flag_field, django_assert_num_queries):
+    UserModel = get_user_model()
+    UserModel.objects.create_user("registered")
+
+    with django_assert_num_queries(1):
+        (user,) = with_guest_status(UserModel.objects.all())
+        assert is_guest_user(user) is False
+
+
+@pytest.mark.django_db
+def test_flag_field_backend(flag_field):
+    GuestModel = get_guest_model()
+    UserModel = get_user_model()
+    guest = GuestModel.objects.create_guest_user()
+    user = UserModel.objects.create_user("registered")
+
+    backend = GuestBackend()
+    assert backend.authenticate(request=None, username=guest.username) == guest
+    assert backend.authenticate(request=None, username=user.username) is None
+
+
+@pytest.mark.django_db
+def test_flag_field_convert(flag_field):
+    GuestModel = get_guest_model()
+    user = GuestModel.objects.create_guest_user()
+    form = UserCreationForm(
+        instance=user,
+        data={
+            "username": "converted",
+            "password1": "7mashedPotatoes",
+            "password2": "7mashedPotatoes",
+        },
+    )
+    assert form.is_valid(), form.errors
+    GuestModel.objects.convert(form)
+
+    user = get_user_model().objects.get(pk=user.pk)
+    assert user.is_staff is False
+    assert is_guest_user(user) is False
+
+
+@pytest.mark.django_db
+def test_backfill_guest_flag(settings):
+    GuestModel = get_guest_model()
+    UserModel = get_user_model()
+    guests = [GuestModel.objects.create_guest_user() for _ in range(3)]
+    registered = UserModel.objects.create_user("registered", is_staff=True)
+
+    settings.GUEST_USER_FLAG_FIELD = "is_staff"
+    out = StringIO()
+    call_command("backfill_guest_flag", batch_size=2, stdout=out)
+
+    assert set(UserModel.objects.filter(is_staff=True)) == set(guests)
+    registered.refresh_from_db()
+    assert registered.is_staff is False
+    assert "Flagged 3 guest users, unflagged 1 registered users." in out.getvalue()
+
+
+def test_backfill_guest_flag_without_setting():
+    with pytest.raises(CommandError):
+        call_command("backfill_guest_flag")
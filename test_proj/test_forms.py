@@ -6,8 +6,9 @@ import pytest
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.forms import ModelForm
+from guest_user.exceptions import NotGuestError
 from guest_user.forms import UserCreationForm
-from guest_user.functions import get_guest_model, is_guest_user
+from guest_user.functions import get_guest_model, is_guest_user, with_guest_status
 
 
 @pytest.mark.django_db
@@ -153,6 +154,28 @@ class TestUserCreationForm:
         assert converted_user.check_password("complexpassword123")
         assert not is_guest_user(converted_user)
 
+    def test_form_save_deleted_guest(self):
+        """Test a guest whose Guest row is gone is not converted."""
+        GuestModel = get_guest_model()
+        user = GuestModel.objects.create_guest_user()
+        # Loaded with its guest status, like the user of a guest request.
+        guest_user = with_guest_status(get_user_model().objects).get(pk=user.pk)
+        form_data = {
+            "username": "newusername",
+            "password1": "complexpassword123",
+            "password2": "complexpassword123",
+        }
+        form = UserCreationForm(instance=guest_user, data=form_data)
+        assert form.is_valid(), form.errors
+        # The Guest row is gone, e.g. in a detached partition.
+        GuestModel.objects.filter(user=guest_user).delete()
+
+        with pytest.raises(NotGuestError):
+            form.save()
+
+        guest_user.refresh_from_db()
+        assert guest_user.username != "newusername"
+
     def test_form_get_credentials_method(self):
         """Test the get_credentials method returns correct authentication data."""
         GuestModel = get_guest_model()
@@ -3,10 +3,12 @@ from django.contrib.auth import get_user_model
 from django.test import RequestFactory
 
 from guest_user.functions import (
+    GUEST_STATUS_ATTR,
     generate_numbered_username,
     generate_uuid_username,
     get_guest_model,
     is_guest_user,
+    with_guest_status,
 )
 
 
@@ -70,3 +72,29 @@ def test_generate_numbered_username_unique():
     count = 1000  # 10% of a 4 digit number space
     names = {generate_numbered_username() for _ in range(count)}
     assert len(names) > 900  # still enough?
+
+
+@pytest.mark.django_db
+def test_with_guest_status(django_assert_num_queries):
+    UserModel = get_user_model()
+    GuestModel = get_guest_model()
+    UserModel.objects.create_user("registered")
+    GuestModel.objects.create_guest_user()
+    GuestModel.objects.create_guest_user()
+
+    with django_assert_num_queries(1):
+        users = list(with_guest_status(UserModel.objects.order_by("pk")))
+        statuses = [is_guest_user(user) for user in users]
+
+    assert statuses == [False, True, True]
+
+
+@pytest.mark.django_db
+def test_with_guest_status_filter():
+    UserModel = get_user_model()
+    GuestModel = get_guest_model()
+    UserModel.objects.create_user("registered")
+    guest = GuestModel.objects.create_guest_user()
+
+    queryset = with_guest_status(UserModel.objects.all())
+    assert list(queryset.filter(**{GUEST_STATUS_ATTR: True})) == [guest]
@@ -2,15 +2,24 @@
 Tests for guest_user management commands.
 """
 
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
 from io import StringIO
 
 import pytest
 from django.core.management import call_command
 from django.core.management.base import CommandError
+from django.db import connection
 from django.test import override_settings
 from django.utils.timezone import now
+from guest_user.cleanup import (
+    delete_expired_guests,
+    delete_expired_parallel,
+    split_expired_range,
+)
 from guest_user.functions import get_guest_model
+from guest_user.models import GuestQuerySet
 
 
 @pytest.mark.django_db
@@ -256,3 +265,196 @@ def test_delete_expired_users_idempotent():
 
     call_command("delete_expired_users", verbosity=0)  # Should not crash
     assert GuestModel.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_delete_expired_users_batch_size(create_expired_guests):
+    """Test command deletes all expired guests in several batches."""
+    GuestModel = get_guest_model()
+    create_expired_guests(5)
+    GuestModel.objects.create_guest_user()
+
+    out = StringIO()
+    call_command("delete_expired_users", batch_size=2, stdout=out, verbosity=2)
+
+    assert GuestModel.objects.count() == 1
+    output = out.getvalue()
+    assert "Batch 3: 1 guests, 5 total" in output
+    assert "Deleted 5 expired guests" in output
+    assert "auth.User: 5" in output
+
+
+@pytest.mark.django_db
+def test_delete_expired_users_limit(create_expired_guests):
+    """Test command stops after deleting the given number of guests."""
+    GuestModel = get_guest_model()
+    create_expired_guests(5)
+
+    call_command("delete_expired_users", batch_size=2, limit=3, verbosity=0)
+
+    assert GuestModel.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_delete_expired_users_dry_run(create_expired_guests):
+    """Test command only counts expired guests with --dry-run."""
+    GuestModel = get_guest_model()
+    create_expired_guests(3)
+
+    out = StringIO()
+    call_command("delete_expired_users", "--dry-run", batch_size=2, stdout=out)
+
+    assert GuestModel.objects.count() == 3
+    assert "Would delete 3 expired guests." in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_delete_expired_users_max_runtime(create_expired_guests):
+    """Test command stops when the runtime is exceeded."""
+    GuestModel = get_guest_model()
+    create_expired_guests(3)
+
+    out = StringIO()
+    call_command("delete_expired_users", batch_size=1, max_runtime=0, stdout=out)
+
+    assert GuestModel.objects.count() == 2
+    assert "Stopping after" in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_delete_expired_users_sleep(monkeypatch, create_expired_guests):
+    """Test command waits between batches."""
+    sleeps = []
+    monkeypatch.setattr("time.sleep", sleeps.append)
+    create_expired_guests(3)
+
+    call_command(
+        "delete_expired_users", batch_size=1, sleep_between_batches=0.5, verbosity=0
+    )
+
+    assert sleeps == [0.5, 0.5, 0.5]
+
+
+@pytest.mark.django_db
+def test_split_expired_range(create_expired_guests):
+    """Test expired guests are split into disjoint ranges of primary keys."""
+    GuestModel = get_guest_model()
+    create_expired_guests(5)
+    GuestModel.objects.create_guest_user()
+
+    ranges = split_expired_range(2)
+
+    assert len(ranges) == 2
+    pks = [set(qs.filter_expired().values_list("pk", flat=True)) for qs in ranges]
+    assert not pks[0] & pks[1]
+    assert len(pks[0] | pks[1]) == 5
+
+
+@pytest.mark.django_db
+def test_split_expired_range_no_expired():
+    """Test nothing is split without expired guests."""
+    get_guest_model().objects.create_guest_user()
+
+    assert split_expired_range(4) == []
+
+
+@pytest.mark.django_db
+def test_split_expired_range_non_integer_pk(monkeypatch):
+    """Test guests with non-integer primary keys are not split."""
+    monkeypatch.setattr(
+        GuestQuerySet, "aggregate", lambda self, **kwargs: {"low": "a", "high": "z"}
+    )
+    queryset = get_guest_model().objects.all()
+
+    assert split_expired_range(4, queryset) == [queryset]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_delete_expired_users_workers(create_expired_guests):
+    """Test command deletes expired guests with several workers."""
+    GuestModel = get_guest_model()
+    create_expired_guests(6)
+    GuestModel.objects.create_guest_user()
+
+    out = StringIO()
+    call_command("delete_expired_users", workers=2, batch_size=2, stdout=out)
+
+    assert GuestModel.objects.count() == 1
+    output = out.getvalue()
+    assert "Deleted 6 expired guests" in output
+    assert "Worker 1: 3 guests" in output
+    assert "Worker 2: 3 guests" in output
+
+
+@pytest.mark.django_db(transaction=True)
+def test_delete_expired_users_workers_limit(create_expired_guests):
+    """Test the limit is shared between workers."""
+    GuestModel = get_guest_model()
+    create_expired_guests(6)
+
+    call_command("delete_expired_users", workers=2, limit=3, verbosity=0)
+
+    assert GuestModel.objects.count() == 3
+
+
+@pytest.mark.django_db(transaction=True)
+def test_delete_expired_parallel_uneven_limit(create_expired_guests):
+    """Test the limit left over by a small partition goes to the others."""
+    GuestModel = get_guest_model()
+    create_expired_guests(4)
+    # Leave a gap in the primary keys, so the second range holds one guest.
+    gap = [GuestModel.objects.create_guest_user() for _ in range(6)]
+    GuestModel.objects.filter(user__in=gap).delete()
+    user = GuestModel.objects.create_guest_user()
+    GuestModel.objects.filter(user=user).update(created_at=now() - timedelta(days=25))
+
+    results = delete_expired_parallel(2, limit=4, batch_size=10)
+
+    assert [stats.guests for stats in results] == [3, 1]
+    assert GuestModel.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_delete_expired_retries_skipped(monkeypatch, create_expired_guests):
+    """Test guests skipped while locked are retried at the end."""
+    GuestModel = get_guest_model()
+    create_expired_guests(3)
+    locked = GuestModel.objects.order_by("user").values_list("user", flat=True)[0]
+    expired_page = GuestQuerySet.expired_page
+    calls = []
+
+    def skip_first_guest(self, batch_size, after=None, skip_locked=False):
+        calls.append(after)
+        page = self if len(calls) > 1 else self.exclude(user=locked)
+        return expired_page(page, batch_size, after=after, skip_locked=skip_locked)
+
+    monkeypatch.setattr(GuestQuerySet, "expired_page", skip_first_guest)
+    stats = delete_expired_guests(batch_size=10, skip_locked=True)
+
+    assert stats.guests == 3
+    assert GuestModel.objects.count() == 0
+    assert calls[2] is None
+
+
+@pytest.mark.skipif(
+    connection.vendor != "postgresql", reason="Requires SELECT ... SKIP LOCKED."
+)
+@pytest.mark.django_db(transaction=True)
+def test_delete_expired_concurrent_workers(create_expired_guests):
+    """Test concurrent cleanups never delete the same guests."""
+    GuestModel = get_guest_model()
+    create_expired_guests(40)
+    barrier = threading.Barrier(2)
+
+    def worker():
+        barrier.wait()
+        try:
+            return delete_expired_guests(batch_size=3, skip_locked=True)
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = list(executor.map(lambda _: worker(), range(2)))
+
+    assert sum(stats.guests for stats in results) == 40
+    assert GuestModel.objects.count() == 0
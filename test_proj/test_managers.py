@@ -1,7 +1,11 @@
 from datetime import timedelta
 
 import pytest
+from allauth.account.models import EmailAddress
+from django.contrib.auth import get_user_model
+from django.db import connection
 from django.utils.timezone import now
+from guest_user.exceptions import NotGuestError
 from guest_user.forms import UserCreationForm
 from guest_user.functions import get_guest_model, is_guest_user
 from guest_user.signals import converted
@@ -72,3 +76,65 @@ def test_convert_sends_signal():
 
     assert not is_guest_user(converted_user)
     assert guest_user.id == converted_user.id
+
+
+@pytest.mark.django_db
+def test_manager_delete_expired_in_batches():
+    GuestModel = get_guest_model()
+    for i in range(5):
+        user = GuestModel.objects.create_guest_user()
+        EmailAddress.objects.create(user=user, email=f"guest{i}@example.com")
+    GuestModel.objects.update(created_at=now() - timedelta(days=18))
+    GuestModel.objects.create_guest_user()
+
+    total, counts = GuestModel.objects.delete_expired(batch_size=2)
+
+    assert counts["auth.User"] == 5
+    assert counts["guest_user.Guest"] == 5
+    assert counts["account.EmailAddress"] == 5
+    assert total == sum(counts.values())
+    assert GuestModel.objects.count() == 1
+    assert EmailAddress.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_manager_delete_expired_nothing():
+    assert get_guest_model().objects.delete_expired() == (0, {})
+
+
+@pytest.mark.skipif(connection.vendor != "sqlite", reason="SQLite query plan")
+@pytest.mark.django_db
+def test_manager_expired_page_uses_covering_index():
+    page = get_guest_model().objects.filter_expired().order_by("created_at", "user")
+    query = page.values_list("created_at", "user")[:10].query
+    sql, params = query.sql_with_params()
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        plan = " ".join(str(row[-1]) for row in cursor.fetchall())
+
+    assert get_user_model()._meta.db_table not in sql
+    assert "COVERING INDEX guest_user_created_user_idx" in plan
+
+
+@pytest.mark.django_db
+def test_convert_deleted_guest():
+    GuestModel = get_guest_model()
+    guest_user = GuestModel.objects.create_guest_user()
+    username = guest_user.username
+    # The Guest row is gone, e.g. in a detached partition.
+    GuestModel._base_manager.filter(user=guest_user)._raw_delete(GuestModel.objects.db)
+
+    form = UserCreationForm(
+        instance=guest_user,
+        data={
+            "username": "friendlyBaron45",
+            "password1": "7mashedPotatoes",
+            "password2": "7mashedPotatoes",
+        },
+    )
+    assert form.is_valid(), form.errors
+    with pytest.raises(NotGuestError):
+        GuestModel.objects.convert(form)
+
+    assert get_user_model().objects.get(pk=guest_user.pk).username == username
@@ -0,0 +1,185 @@
+from datetime import timedelta
+
+import pytest
+from django.conf import settings as django_settings
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import RequestFactory
+from django.utils.timezone import now
+from guest_user.context_processors import guest_user
+from guest_user.functions import get_guest_model, is_guest_request, is_guest_user
+from guest_user.middleware import (
+    GuestAuthenticationMiddleware,
+    GuestStatusMiddleware,
+    mark_snapshot_stale,
+)
+from guest_user.sessions import SNAPSHOT_SESSION_KEY, load_user_snapshot
+
+
+@pytest.fixture
+def snapshot_settings(settings):
+    settings.GUEST_USER_SESSION_SNAPSHOT = True
+    settings.MIDDLEWARE = [
+        (
+            "guest_user.middleware.GuestAuthenticationMiddleware"
+            if middleware == "django.contrib.auth.middleware.AuthenticationMiddleware"
+            else middleware
+        )
+        for middleware in settings.MIDDLEWARE
+    ]
+    post_save.connect(mark_snapshot_stale, sender=django_settings.AUTH_USER_MODEL)
+    yield settings
+    post_save.disconnect(mark_snapshot_stale, sender=django_settings.AUTH_USER_MODEL)
+
+
+@pytest.mark.django_db
+def test_session_snapshot(client, snapshot_settings, django_assert_num_queries):
+    response = client.get("/allow_guest_user/")
+    guest_user = response.context["user"]
+    assert SNAPSHOT_SESSION_KEY in client.session
+
+    # Only the session is loaded from the database.
+    with django_assert_num_queries(1):
+        response = client.get("/guest_user_required/")
+    assert response.status_code == 200
+    assert response.context["user"] == guest_user
+    assert response.context["user"].username == guest_user.username
+
+
+@pytest.mark.django_db
+def test_session_snapshot_convert(client, snapshot_settings):
+    client.get("/allow_guest_user/")
+    response = client.post(
+        "/convert/",
+        {
+            "username": "converted_user",
+            "password1": "c0mpl3xhunter2",
+            "password2": "c0mpl3xhunter2",
+        },
+    )
+    assert response.status_code == 302
+    assert SNAPSHOT_SESSION_KEY not in client.session
+
+    response = client.get("/convert/success/")
+    assert response.context["user"].username == "converted_user"
+    assert not is_guest_user(response.context["user"])
+
+
+@pytest.mark.django_db
+def test_session_snapshot_disabled(client, settings):
+    client.get("/allow_guest_user/")
+    assert SNAPSHOT_SESSION_KEY not in client.session
+
+
+@pytest.mark.django_db
+def test_session_snapshot_invalid(client, snapshot_settings):
+    client.get("/allow_guest_user/")
+    assert load_user_snapshot(client.session[SNAPSHOT_SESSION_KEY]) is not None
+
+    session = client.session
+    session[SNAPSHOT_SESSION_KEY] = "tampered"
+    session.save()
+    assert load_user_snapshot("tampered") is None
+
+    # Falls back to loading the user from the database.
+    response = client.get("/guest_user_required/")
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_session_snapshot_saved_user(client, snapshot_settings):
+    client.get("/allow_guest_user/")
+    request = RequestFactory().get("/")
+    request.session = client.session
+
+    middleware = GuestAuthenticationMiddleware(lambda request: HttpResponse())
+    middleware.process_request(request)
+    request.user.first_name = "Renamed"
+    request.user.save()
+    middleware.process_response(request, HttpResponse())
+
+    user = load_user_snapshot(request.session[SNAPSHOT_SESSION_KEY])
+    assert user.first_name == "Renamed"
+
+
+@pytest.fixture
+def count_guest_checks(monkeypatch):
+    calls = []
+
+    def _is_guest_user(user):
+        calls.append(user)
+        return is_guest_user(user)
+
+    monkeypatch.setattr("guest_user.functions.is_guest_user", _is_guest_user)
+    return calls
+
+
+@pytest.mark.django_db
+def test_guest_status_middleware(guest_client, count_guest_checks):
+    request = RequestFactory().get("/")
+    request.user = guest_client.user
+    GuestStatusMiddleware(lambda request: HttpResponse()).process_request(request)
+    assert count_guest_checks == []
+
+    context = guest_user(request)
+    assert is_guest_request(request) is True
+    assert is_guest_request(request) is True
+    template = Template("{% if is_guest %}guest{% endif %}")
+    assert template.render(Context(context)) == "guest"
+    assert len(count_guest_checks) == 1
+
+
+@pytest.mark.django_db
+def test_guest_status_without_middleware(authenticated_client, count_guest_checks):
+    request = RequestFactory().get("/")
+    request.user = get_user_model().objects.get(username="registered_user")
+
+    assert is_guest_request(request) is False
+    assert is_guest_request(request) is False
+    assert len(count_guest_checks) == 1
+
+
+@pytest.mark.django_db
+def test_guest_status_per_request(client, settings, count_guest_checks):
+    settings.MIDDLEWARE = [
+        *settings.MIDDLEWARE,
+        "guest_user.middleware.GuestStatusMiddleware",
+    ]
+    client.get("/allow_guest_user/")
+    count_guest_checks.clear()
+
+    response = client.get("/mixin/guest_user_required/")
+    assert response.status_code == 200
+    assert response.wsgi_request.is_guest
+    assert len(count_guest_checks) == 1
+
+
+@pytest.mark.django_db
+def test_session_snapshot_expired(client, snapshot_settings, monkeypatch):
+    snapshot_settings.GUEST_USER_MAX_AGE = 3600
+    response = client.get("/allow_guest_user/")
+    guest_user = response.context["user"]
+
+    later = now() + timedelta(seconds=3601)
+    monkeypatch.setattr("guest_user.sessions.now", lambda: later)
+    monkeypatch.setattr("guest_user.models.now", lambda: later)
+    assert load_user_snapshot(client.session[SNAPSHOT_SESSION_KEY]) is None
+    get_guest_model().objects.delete_expired()
+
+    response = client.get("/allow_guest_user/")
+    assert response.context["user"] != guest_user
+
+
+@pytest.mark.django_db
+def test_session_snapshot_sliding_expiry(client, snapshot_settings, monkeypatch):
+    snapshot_settings.GUEST_USER_MAX_AGE = 3600
+    snapshot_settings.GUEST_USER_SLIDING_EXPIRY = True
+    client.get("/allow_guest_user/")
+    snapshot = client.session[SNAPSHOT_SESSION_KEY]
+
+    later = now() + timedelta(seconds=3601)
+    monkeypatch.setattr("guest_user.sessions.now", lambda: later)
+    assert load_user_snapshot(snapshot) is None
+    assert load_user_snapshot(snapshot, seen=int(later.timestamp()) - 60) is not None
@@ -0,0 +1,118 @@
+from datetime import date, datetime, timezone
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from guest_user.functions import get_guest_model
+from guest_user.partitions import (
+    create_partitions,
+    drop_partition,
+    expired_partitions,
+    is_partitioned,
+    list_partitions,
+    parse_upper_bound,
+    partition_bounds,
+    partition_name,
+    setup_partitioning,
+)
+
+postgresql_only = pytest.mark.skipif(
+    connection.vendor != "postgresql", reason="Partitioning requires PostgreSQL."
+)
+
+
+def test_partition_name():
+    assert partition_name("guest", date(2024, 3, 9)) == "guest_p20240309"
+
+
+def test_partition_bounds():
+    assert partition_bounds(date(2024, 3, 9)) == (
+        datetime(2024, 3, 9, tzinfo=timezone.utc),
+        datetime(2024, 3, 10, tzinfo=timezone.utc),
+    )
+
+
+def test_parse_upper_bound():
+    bound = "FOR VALUES FROM ('2024-03-09 00:00:00+00') TO ('2024-03-10 00:00:00+00')"
+    assert parse_upper_bound(bound) == datetime(2024, 3, 10, tzinfo=timezone.utc)
+
+    bound = "FOR VALUES FROM (MINVALUE) TO ('2024-03-10 00:00:00+00')"
+    assert parse_upper_bound(bound) == datetime(2024, 3, 10, tzinfo=timezone.utc)
+
+    assert parse_upper_bound("DEFAULT") is None
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(connection.vendor == "postgresql", reason="Tests other databases.")
+def test_partitions_command_requires_postgresql():
+    with pytest.raises(CommandError, match="only supported on PostgreSQL"):
+        call_command("guest_user_partitions", verbosity=0)
+
+
+@pytest.fixture
+def partitioned(db):
+    """Partition the Guest table, dropping foreign keys of the test models to it."""
+    table = get_guest_model()._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+            "WHERE contype = 'f' AND confrelid = to_regclass(%s)",
+            [table],
+        )
+        for referencing, constraint in cursor.fetchall():
+            cursor.execute(
+                f'ALTER TABLE "{referencing}" DROP CONSTRAINT "{constraint}"'
+            )
+    setup_partitioning()
+
+
+@postgresql_only
+def test_setup_partitioning(partitioned):
+    assert is_partitioned()
+    names = [name for name, _upper in list_partitions()]
+    table = get_guest_model()._meta.db_table
+    assert names == [f"{table}_default", f"{table}_legacy"]
+
+    created = create_partitions(days=3)
+    assert len(created) == 2  # Today is covered by the legacy partition.
+    get_guest_model().objects.create_guest_user()
+
+
+@postgresql_only
+def test_drop_expired_partition(partitioned, settings):
+    Guest = get_guest_model()
+    user = Guest.objects.create_guest_user()
+    table = Guest._meta.db_table
+    settings.GUEST_USER_MAX_AGE = -2 * 24 * 60 * 60
+
+    assert f"{table}_legacy" in expired_partitions()
+    guests, counts = drop_partition(f"{table}_legacy")
+
+    assert guests == 1
+    assert counts[get_user_model()._meta.label] == 1
+    assert not get_user_model().objects.filter(pk=user.pk).exists()
+    assert f"{table}_legacy" not in [name for name, _upper in list_partitions()]
+
+
+@postgresql_only
+def test_drop_partition_skips_converted(partitioned, settings):
+    settings.GUEST_USER_FLAG_FIELD = "is_staff"
+    Guest = get_guest_model()
+    guest = Guest.objects.create_guest_user()
+    converted = Guest.objects.create_guest_user()
+    table = Guest._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"ALTER TABLE {connection.ops.quote_name(table)} "
+            f"DETACH PARTITION {connection.ops.quote_name(table + '_legacy')}"
+        )
+    # Converted while the partition was detached.
+    get_user_model().objects.filter(pk=converted.pk).update(is_staff=False)
+
+    guests, _counts = drop_partition(f"{table}_legacy")
+
+    assert guests == 1
+    assert not get_user_model().objects.filter(pk=guest.pk).exists()
+    assert get_user_model().objects.filter(pk=converted.pk).exists()
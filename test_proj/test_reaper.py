@@ -0,0 +1,126 @@
+import json
+import signal
+from datetime import datetime, time
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import OperationalError
+from guest_user.functions import get_guest_model
+from guest_user.management.commands.guest_user_reaper import (
+    Command,
+    in_window,
+    parse_window,
+)
+
+
+def test_parse_window():
+    assert parse_window("01:00-05:30") == (time(1, 0), time(5, 30))
+
+
+def test_parse_window_invalid():
+    with pytest.raises(CommandError):
+        call_command("guest_user_reaper", "--once", "--off-peak", "1-5")
+
+
+@pytest.mark.parametrize(
+    "moment, expected",
+    [(time(0, 30), False), (time(2, 0), True), (time(5, 30), False)],
+)
+def test_in_window(moment, expected):
+    assert in_window(moment, (time(1, 0), time(5, 30))) is expected
+
+
+@pytest.mark.parametrize(
+    "moment, expected",
+    [(time(23, 0), True), (time(3, 0), True), (time(12, 0), False)],
+)
+def test_in_window_over_midnight(moment, expected):
+    assert in_window(moment, (time(22, 0), time(6, 0))) is expected
+
+
+@pytest.mark.django_db
+def test_reaper_once(tmp_path, create_expired_guests):
+    Guest = get_guest_model()
+    create_expired_guests(3)
+    Guest.objects.create_guest_user()
+    heartbeat = tmp_path / "heartbeat.json"
+
+    call_command(
+        "guest_user_reaper",
+        "--once",
+        batch_size=2,
+        heartbeat=str(heartbeat),
+        verbosity=0,
+    )
+
+    assert Guest.objects.count() == 1
+    data = json.loads(heartbeat.read_text())
+    assert data["deleted"] == 3
+    assert data["total"] == 3
+
+
+@pytest.mark.django_db
+def test_reaper_off_peak_batch_size(capsys, monkeypatch, create_expired_guests):
+    create_expired_guests(3)
+    monkeypatch.setattr(
+        "guest_user.management.commands.guest_user_reaper.localtime",
+        lambda: datetime(2024, 3, 9, 2, 30),
+    )
+
+    call_command(
+        "guest_user_reaper",
+        "--once",
+        "--off-peak",
+        "01:00-05:00",
+        batch_size=1,
+        off_peak_batch_size=5,
+    )
+
+    assert "3 expired guests in 1 batches of up to 5" in capsys.readouterr().out
+
+
+@pytest.mark.django_db
+def test_reaper_stops_on_signal(monkeypatch, create_expired_guests):
+    create_expired_guests(3)
+    command = Command()
+
+    def run(**kwargs):
+        # Simulate a SIGTERM during the first run.
+        signal.raise_signal(signal.SIGTERM)
+
+    monkeypatch.setattr(command, "run", run)
+    call_command(command, interval=3600, verbosity=0)
+
+    assert signal.getsignal(signal.SIGTERM) is signal.SIG_DFL
+
+
+@pytest.mark.django_db
+def test_reaper_retries_after_database_error(monkeypatch, capsys):
+    command = Command()
+    command.retry_delay = 0
+    calls = []
+
+    def run(**kwargs):
+        calls.append(kwargs)
+        if len(calls) == 1:
+            raise OperationalError("server closed the connection unexpectedly")
+        command.stop_event.set()
+
+    monkeypatch.setattr(command, "run", run)
+    call_command(command, interval=3600)
+
+    assert len(calls) == 2
+    assert "retrying in 0s: server closed" in capsys.readouterr().err
+
+
+@pytest.mark.django_db
+def test_reaper_once_database_error(monkeypatch):
+    command = Command()
+
+    def run(**kwargs):
+        raise OperationalError("database is locked")
+
+    monkeypatch.setattr(command, "run", run)
+    with pytest.raises(CommandError, match="database is locked"):
+        call_command(command, "--once", verbosity=0)
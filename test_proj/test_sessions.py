@@ -0,0 +1,131 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth import BACKEND_SESSION_KEY, SESSION_KEY
+from django.contrib.sessions.backends.cache import SessionStore as CacheStore
+from django.contrib.sessions.backends.file import SessionStore as FileStore
+from django.contrib.sessions.models import Session
+from django.test import RequestFactory, override_settings
+from django.utils.timezone import now
+from guest_user.functions import get_guest_model
+from guest_user.sessions import STATUS_SESSION_KEY, delete_sessions, is_guest_session
+
+
+def make_request(client):
+    request = RequestFactory().get("/")
+    request.session = client.session
+    return request
+
+
+@pytest.mark.django_db
+def test_is_guest_session_anonymous(client, django_assert_num_queries):
+    request = make_request(client)
+    with django_assert_num_queries(0):
+        assert is_guest_session(request) is False
+
+
+@pytest.mark.django_db
+def test_is_guest_session_guest(client, django_assert_num_queries):
+    client.get("/allow_guest_user/")
+    request = make_request(client)
+    assert request.session[STATUS_SESSION_KEY] == [request.session[SESSION_KEY], True]
+
+    with django_assert_num_queries(0):
+        assert is_guest_session(request) is True
+
+
+@pytest.mark.django_db
+def test_is_guest_session_converted(client):
+    client.get("/allow_guest_user/")
+    client.post(
+        "/convert/",
+        {
+            "username": "converted_user",
+            "password1": "c0mpl3xhunter2",
+            "password2": "c0mpl3xhunter2",
+        },
+    )
+    request = make_request(client)
+    assert STATUS_SESSION_KEY not in request.session
+    assert is_guest_session(request) is False
+
+
+@pytest.mark.django_db
+def test_is_guest_session_without_status(guest_client, django_assert_num_queries):
+    """Sessions without a stored status are checked once."""
+    session = guest_client.session
+    session[BACKEND_SESSION_KEY] = "guest_user.backends.GuestBackend"
+    session.save()
+    request = make_request(guest_client)
+    request.user = guest_client.user
+    assert STATUS_SESSION_KEY not in request.session
+
+    with django_assert_num_queries(1):
+        assert is_guest_session(request) is True
+        assert is_guest_session(request) is True
+    assert request.session[STATUS_SESSION_KEY][1] is True
+
+
+@pytest.mark.django_db
+@override_settings(GUEST_USER_PURGE_SESSIONS=True)
+def test_guest_session_key_recorded(client):
+    client.get("/allow_guest_user/")
+    guest = get_guest_model().objects.get()
+    assert guest.session_key == client.session.session_key
+
+
+@pytest.mark.django_db
+@override_settings(
+    GUEST_USER_PURGE_SESSIONS=True,
+    SESSION_ENGINE="django.contrib.sessions.backends.signed_cookies",
+)
+def test_guest_session_key_not_recorded_signed_cookies(client):
+    response = client.get("/allow_guest_user/")
+    assert response.context["user"].is_authenticated
+    assert get_guest_model().objects.get().session_key == ""
+
+
+@pytest.mark.django_db
+def test_guest_session_key_not_recorded_by_default(client):
+    client.get("/allow_guest_user/")
+    assert get_guest_model().objects.get().session_key == ""
+
+
+@pytest.mark.django_db
+@override_settings(GUEST_USER_PURGE_SESSIONS=True)
+def test_delete_expired_purges_sessions(client):
+    client.get("/allow_guest_user/")
+    session_key = client.session.session_key
+    Guest = get_guest_model()
+    Guest.objects.update(created_at=now() - timedelta(days=25))
+
+    Guest.objects.delete_expired()
+
+    assert not Session.objects.filter(session_key=session_key).exists()
+
+
+@pytest.mark.django_db
+@override_settings(
+    GUEST_USER_PURGE_SESSIONS=True,
+    SESSION_ENGINE="django.contrib.sessions.backends.cache",
+)
+def test_delete_sessions_cache(client):
+    client.get("/allow_guest_user/")
+    session_key = client.session.session_key
+    assert CacheStore().exists(session_key)
+
+    delete_sessions([session_key])
+
+    assert not CacheStore().exists(session_key)
+
+
+@pytest.mark.django_db
+@override_settings(SESSION_ENGINE="django.contrib.sessions.backends.file")
+def test_delete_sessions_file(client):
+    client.get("/allow_guest_user/")
+    session_key = client.session.session_key
+    assert FileStore().exists(session_key)
+
+    delete_sessions([session_key, "missing"])
+
+    assert not FileStore().exists(session_key)
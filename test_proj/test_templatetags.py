@@ -335,3 +335,72 @@ class TestTemplateTagIntegration:
         assert end_time - start_time < 1.0
         # Should render correctly
         assert "G" * 100 in result.replace("\n", "").replace(" ", "")
+
+
+@pytest.mark.django_db
+class TestGuestStatusTemplateTag:
+    """Test the guest_status template tag."""
+
+    def test_guest_status_single_query(self, django_assert_num_queries):
+        """The status of all users is resolved with one query."""
+        GuestModel = get_guest_model()
+        UserModel = get_user_model()
+
+        for _ in range(3):
+            GuestModel.objects.create_guest_user()
+        UserModel.objects.create_user("regular", password="test123")
+        users = list(UserModel.objects.order_by("pk"))
+
+        template = Template(
+            """
+            {% load guest_user %}
+            {% guest_status users as guest_ids %}
+            {% for user in users %}{% if user|is_guest_user %}G{% else %}R{% endif %}{% endfor %}
+            """
+        )
+
+        with django_assert_num_queries(1):
+            result = template.render(Context({"users": users})).strip()
+
+        assert result == "GGGR"
+
+    def test_guest_status_variable(self):
+        """The tag stores the guest user IDs."""
+        GuestModel = get_guest_model()
+        UserModel = get_user_model()
+
+        guest_user = GuestModel.objects.create_guest_user()
+        regular_user = UserModel.objects.create_user("regular", password="test123")
+
+        template = Template(
+            """
+            {% load guest_user %}
+            {% guest_status users as guest_ids %}
+            {% for user in users %}{% if user.pk in guest_ids %}G{% else %}R{% endif %}{% endfor %}
+            """
+        )
+        context = Context({"users": [guest_user, regular_user, None]})
+        result = template.render(context).strip()
+
+        assert result == "GRR"
+
+    def test_guest_status_without_variable(self):
+        """The tag renders nothing without a variable."""
+        guest_user = get_guest_model().objects.create_guest_user()
+
+        template = Template(
+            """
+            {% load guest_user %}
+            [{% guest_status users %}]
+            {% if user|is_guest_user %}guest{% endif %}
+            """
+        )
+        context = Context({"users": [guest_user], "user": guest_user})
+        result = " ".join(template.render(context).split())
+
+        assert result == "[] guest"
+
+    def test_guest_status_invalid_syntax(self):
+        """The tag requires a list of users."""
+        with pytest.raises(TemplateSyntaxError):
+            Template("{% load guest_user %}{% guest_status users into ids %}")